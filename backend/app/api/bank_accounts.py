@@ -1,5 +1,7 @@
 """API endpoints for bank accounts and transaction imports."""
 from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Query
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import date
@@ -14,6 +16,11 @@ from app.services.bank_import import parse_bank_csv
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+IMPORT_HASH_BATCH = 500  # hashes per dedup IN (...) lookup
+
+# INSERT ... ON CONFLICT for the databases the app runs on
+_INSERT_BY_DIALECT = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
 
 # ── Schemas ──
 
@@ -77,9 +84,7 @@ def _recalculate_balance(db: Session, bank_account_id: int):
     if not ba:
         return
     total = db.query(
-        __import__('sqlalchemy', fromlist=['func']).func.coalesce(
-            __import__('sqlalchemy', fromlist=['func']).func.sum(BankTransaction.amount), 0
-        )
+        func.coalesce(func.sum(BankTransaction.amount), 0)
     ).filter(BankTransaction.bank_account_id == bank_account_id).scalar()
     ba.current_balance = round(ba.opening_balance + (total or 0), 2)
 
@@ -169,12 +174,18 @@ async def import_csv(
     if not file.filename or not file.filename.lower().endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files are supported")
 
-    content = await file.read()
-    if len(content) > 5_000_000:  # 5MB limit
+    # UploadFile.size is only set for multipart uploads; measure the file otherwise
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, 2)  # Seek to end
+        file_size = file.file.tell()
+        file.file.seek(0)  # Reset to beginning
+    if file_size > 5_000_000:  # 5MB limit
         raise HTTPException(status_code=400, detail="File too large (max 5MB)")
 
     try:
-        parsed = parse_bank_csv(content)
+        # Parse straight from the spooled upload rather than reading it all into memory
+        parsed = parse_bank_csv(file.file)
     except Exception as e:
         logger.error("CSV parse error: %s", e)
         raise HTTPException(status_code=400, detail="Failed to parse CSV file. Check the format.")
@@ -182,14 +193,18 @@ async def import_csv(
     if not parsed:
         raise HTTPException(status_code=400, detail="No transactions found in CSV. Check headers and date format.")
 
-    # Dedup: get existing hashes for this account
-    existing_hashes = set(
-        h[0] for h in db.query(BankTransaction.import_hash)
-        .filter(BankTransaction.bank_account_id == bank_account_id)
-        .all()
-    )
-
-    imported = 0
+    # Dedup: look up only the hashes in this file that the account already has
+    file_hashes = list({txn["import_hash"] for txn in parsed})
+    existing_hashes = set()
+    for i in range(0, len(file_hashes), IMPORT_HASH_BATCH):
+        existing_hashes.update(db.scalars(
+            select(BankTransaction.import_hash).where(
+                BankTransaction.bank_account_id == bank_account_id,
+                BankTransaction.import_hash.in_(file_hashes[i:i + IMPORT_HASH_BATCH]),
+            )
+        ))
+
+    rows = []
     skipped = 0
 
     for txn in parsed:
@@ -197,22 +212,29 @@ async def import_csv(
             skipped += 1
             continue
 
-        bt = BankTransaction(
-            bank_account_id=bank_account_id,
-            transaction_date=txn["transaction_date"],
-            description=txn["description"],
-            amount=txn["amount"],
-            balance=txn.get("balance"),
-            reference=txn.get("reference"),
-            import_hash=txn["import_hash"],
-        )
-        db.add(bt)
+        rows.append({
+            "bank_account_id": bank_account_id,
+            "transaction_date": txn["transaction_date"],
+            "description": txn["description"],
+            "amount": txn["amount"],
+            "balance": txn.get("balance"),
+            "reference": txn.get("reference"),
+            "import_hash": txn["import_hash"],
+        })
         existing_hashes.add(txn["import_hash"])
-        imported += 1
+
+    imported = 0
+    if rows:
+        # A concurrent import of the same statement may have inserted some of
+        # these since the lookup above; the unique import hash index turns
+        # those into skips instead of an IntegrityError
+        stmt = _INSERT_BY_DIALECT[db.get_bind().dialect.name](BankTransaction)
+        imported = len(db.scalars(
+            stmt.on_conflict_do_nothing().returning(BankTransaction.id), rows
+        ).all())
+        skipped += len(rows) - imported
 
     # Recalculate balance
-    db.flush()
-    from sqlalchemy import func
     total = db.query(
         func.coalesce(func.sum(BankTransaction.amount), 0)
     ).filter(BankTransaction.bank_account_id == bank_account_id).scalar()
@@ -10,20 +10,31 @@ import os
 import re
 import uuid
 import shutil
+from functools import lru_cache
 import magic
 
 from app.db import get_db
 from app.config import settings
 from app.models.document import Document
-from app.services.ai_processor import AIDocumentProcessor
-from app.services.ocr import OCRService
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
-# Initialize services
-ai_processor = AIDocumentProcessor()
-ocr_service = OCRService()
+UPLOAD_DIR = settings.upload_dir
+
+
+@lru_cache(maxsize=1)
+def _get_ai_processor():
+    """Build the OCR + LLM processor on first use rather than at import."""
+    from app.services.ai_processor import AIDocumentProcessor
+    return AIDocumentProcessor()
+
+
+async def close_ai_processor():
+    """Release the processor's HTTP connections, if it was ever created."""
+    if _get_ai_processor.cache_info().currsize:
+        await _get_ai_processor().aclose()
+        _get_ai_processor.cache_clear()
 
 # Allowed MIME types mapped to extensions
 ALLOWED_MIMES = {
@@ -89,7 +100,7 @@ async def upload_document(
     # Sanitize filename and generate unique path
     safe_name = _sanitize_filename(file.filename)
     unique_filename = f"{uuid.uuid4()}_{safe_name}"
-    file_path = os.path.join(settings.upload_dir, unique_filename)
+    file_path = os.path.join(UPLOAD_DIR, unique_filename)
 
     # Save file
     try:
@@ -128,19 +139,25 @@ async def upload_document(
     }
 
 
-async def process_document_ai(document_id: int, file_path: str, file_type: str, db: Session):
+def _read_file(file_path: str) -> bytes:
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+async def process_document_ai(
+    document_id: int, file_path: str, file_type: str, db: Session, use_cache: bool = True
+):
     """Process document with AI and update database."""
     document = db.query(Document).filter(Document.id == document_id).first()
     if not document:
         return
 
     try:
-        # Read file
-        with open(file_path, "rb") as f:
-            file_content = f.read()
-
-        # Process with AI
-        result = await ai_processor.process_document(file_content, file_type, document.original_filename)
+        # Read the file straight into the processor call so this frame doesn't
+        # keep the raw bytes alive while the LLM request is in flight
+        result = await _get_ai_processor().process_document(
+            _read_file(file_path), file_type, document.original_filename, use_cache=use_cache
+        )
 
         if result["success"]:
             data = result["data"]
@@ -180,10 +197,15 @@ async def process_document_ai(document_id: int, file_path: str, file_type: str,
     db.commit()
 
 
-def process_document_background(document_id: int, file_path: str, file_type: str, db: Session):
-    """Wrapper for background task processing."""
-    import asyncio
-    asyncio.run(process_document_ai(document_id, file_path, file_type, db))
+async def process_document_background(
+    document_id: int, file_path: str, file_type: str, db: Session, use_cache: bool = True
+):
+    """Wrapper for background task processing.
+
+    Runs on the app's event loop (OCR is pushed to a worker thread), so the
+    processor's pooled Ollama client is shared with every other upload.
+    """
+    await process_document_ai(document_id, file_path, file_type, db, use_cache)
 
 
 @router.get("/")
@@ -321,7 +343,8 @@ async def reprocess_document(
         document.id,
         document.file_path,
         document.file_type,
-        db
+        db,
+        use_cache=False,
     )
 
     return {"message": "Document reprocessing started"}
@@ -1,6 +1,6 @@
 """API endpoints for invoice management."""
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import Response
 from sqlalchemy.orm import Session, joinedload
 from typing import Optional
 from datetime import date
@@ -10,7 +10,6 @@ import logging
 from app.db import get_db
 from app.models.customer import Customer
 from app.models.invoice import Invoice, InvoiceItem
-from app.services.pdf_generator import generate_invoice_pdf
 from app.services.journal_service import create_je_for_invoice_sent, create_je_for_invoice_paid
 
 logger = logging.getLogger(__name__)
@@ -18,6 +17,9 @@ router = APIRouter()
 
 VALID_STATUSES = {"draft", "sent", "paid", "overdue"}
 
+# Most invoices rendered into one combined PDF download
+MAX_PDF_BATCH = 100
+
 
 # ── Schemas ──
 
@@ -195,6 +197,39 @@ async def list_invoices(
     }
 
 
+@router.get("/pdf")
+async def download_invoices_pdf(
+    ids: list[int] = Query(..., min_length=1, max_length=MAX_PDF_BATCH),
+    db: Session = Depends(get_db),
+):
+    """Download several invoices as one PDF, in the order requested."""
+    invoices = (
+        db.query(Invoice)
+        .options(joinedload(Invoice.customer), joinedload(Invoice.items))
+        .filter(Invoice.id.in_(ids))
+        .all()
+    )
+    by_id = {inv.id: inv for inv in invoices}
+    missing = [i for i in ids if i not in by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Invoice not found: {missing[0]}")
+
+    # ReportLab is only needed here; keep it out of worker startup
+    from app.services.pdf_generator import generate_invoices_pdf
+
+    try:
+        pdf_bytes = generate_invoices_pdf([by_id[i] for i in dict.fromkeys(ids)])
+    except Exception as e:
+        logger.error("PDF generation failed for invoices %s: %s", ids, e)
+        raise HTTPException(status_code=500, detail="Failed to generate PDF")
+
+    return Response(
+        pdf_bytes,
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="invoices.pdf"'},
+    )
+
+
 @router.get("/{invoice_id}")
 async def get_invoice(invoice_id: int, db: Session = Depends(get_db)):
     invoice = (
@@ -322,14 +357,19 @@ async def download_invoice_pdf(invoice_id: int, db: Session = Depends(get_db)):
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
 
+    # ReportLab is only needed here; keep it out of worker startup
+    from app.services.pdf_generator import generate_invoice_pdf_bytes
+
     try:
-        pdf_buffer = generate_invoice_pdf(invoice)
+        pdf_bytes = generate_invoice_pdf_bytes(invoice)
     except Exception as e:
         logger.error("PDF generation failed for invoice %d: %s", invoice_id, e)
         raise HTTPException(status_code=500, detail="Failed to generate PDF")
 
-    return StreamingResponse(
-        pdf_buffer,
+    # Sent as one body; a BytesIO handed to StreamingResponse would be
+    # iterated line by line, i.e. split at every newline byte in the PDF
+    return Response(
+        pdf_bytes,
         media_type="application/pdf",
         headers={
             "Content-Disposition": f'attachment; filename="{invoice.invoice_number}.pdf"'
@@ -2,22 +2,37 @@
 API endpoints for financial reports and analytics.
 """
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
-from datetime import datetime, date
+from sqlalchemy import func, extract, case
+from datetime import datetime, date, timedelta
 from typing import Optional
 from collections import defaultdict
+import asyncio
+import orjson
+import time
 
-from app.db import get_db
+from app.db import get_db, SessionLocal
 from app.models.transaction import Transaction
 from app.models.document import Document
 from app.models.account import Account
 from app.models.journal_entry import JournalEntry, JournalEntryLine
 from app.models.invoice import Invoice
+from app.services.journal_service import account_activity
 
 router = APIRouter()
 
 
+def _cents(amount: float | None) -> int:
+    """Convert a dollar amount to integer cents for exact summation."""
+    return round((amount or 0) * 100)
+
+
+def _dollars(cents: int) -> float:
+    """Convert integer cents back to dollars at the serialization boundary."""
+    return cents / 100
+
+
 @router.get("/profit-loss")
 async def profit_and_loss(
     start_date: date = Query(..., description="Start date for the report"),
@@ -30,24 +45,23 @@ async def profit_and_loss(
     """
     # Query transactions within date range
     transactions = db.query(Transaction).filter(
-        Transaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-        Transaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
+        *Transaction.date_between(start_date, end_date)
     ).all()
 
-    # Categorize transactions
-    revenue = 0.0
-    expenses_by_category = defaultdict(float)
-    total_expenses = 0.0
-    total_tax_paid = 0.0
+    # Categorize transactions (summed in integer cents)
+    revenue = 0
+    expenses_by_category = defaultdict(int)
+    total_expenses = 0
+    total_tax_paid = 0
 
     for t in transactions:
         if t.category == "revenue":
-            revenue += t.amount
+            revenue += _cents(t.amount)
         elif t.category == "expense":
-            expenses_by_category[t.subcategory or "Other"] += t.amount
-            total_expenses += t.amount
-            if t.tax_amount:
-                total_tax_paid += t.tax_amount
+            amount = _cents(t.amount)
+            expenses_by_category[t.subcategory or "Other"] += amount
+            total_expenses += amount
+            total_tax_paid += _cents(t.tax_amount)
 
     net_income = revenue - total_expenses
 
@@ -57,16 +71,16 @@ async def profit_and_loss(
             "end": end_date.isoformat(),
         },
         "revenue": {
-            "total": round(revenue, 2),
+            "total": _dollars(revenue),
         },
         "expenses": {
-            "by_category": {k: round(v, 2) for k, v in expenses_by_category.items()},
-            "total": round(total_expenses, 2),
+            "by_category": {k: _dollars(v) for k, v in expenses_by_category.items()},
+            "total": _dollars(total_expenses),
         },
         "taxes": {
-            "total_tax_paid": round(total_tax_paid, 2),
+            "total_tax_paid": _dollars(total_tax_paid),
         },
-        "net_income": round(net_income, 2),
+        "net_income": _dollars(net_income),
         "profit_margin": round((net_income / revenue * 100) if revenue > 0 else 0, 2),
     }
 
@@ -84,29 +98,26 @@ async def expenses_by_category(
         func.count(Transaction.id).label("count")
     ).filter(
         Transaction.category == "expense",
-        Transaction.transaction_date >= datetime.combine(start_date, datetime.min.time()),
-        Transaction.transaction_date <= datetime.combine(end_date, datetime.max.time())
+        *Transaction.date_between(start_date, end_date)
     ).group_by(Transaction.subcategory).all()
 
+    category_cents = [(r.subcategory or "Uncategorized", _cents(r.total), r.count) for r in result]
+    total = sum(cents for _, cents, _ in category_cents)
+
     categories = [
         {
-            "category": r.subcategory or "Uncategorized",
-            "total": round(r.total, 2),
-            "count": r.count,
+            "category": name,
+            "total": _dollars(cents),
+            "count": count,
+            "percentage": round((cents / total * 100) if total > 0 else 0, 2),
         }
-        for r in result
+        for name, cents, count in category_cents
     ]
 
-    total = sum(c["total"] for c in categories)
-
-    # Add percentage
-    for c in categories:
-        c["percentage"] = round((c["total"] / total * 100) if total > 0 else 0, 2)
-
     return {
         "period": {"start": start_date.isoformat(), "end": end_date.isoformat()},
         "categories": sorted(categories, key=lambda x: x["total"], reverse=True),
-        "total": round(total, 2),
+        "total": _dollars(total),
     }
 
 
@@ -119,34 +130,28 @@ async def tax_summary(
     Generate tax summary for Canadian tax filing.
     Shows GST/HST collected and paid, income, deductible expenses.
     """
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year, 12, 31, 23, 59, 59)
-
     transactions = db.query(Transaction).filter(
-        Transaction.transaction_date >= start_date,
-        Transaction.transaction_date <= end_date
+        *Transaction.date_between(date(year, 1, 1), date(year, 12, 31))
     ).all()
 
-    # Calculate tax figures
-    gst_hst_collected = 0.0  # On sales
-    gst_hst_paid = 0.0  # On purchases
-    total_revenue = 0.0
-    total_deductible_expenses = 0.0
-    total_non_deductible = 0.0
+    # Calculate tax figures (summed in integer cents)
+    gst_hst_collected = 0  # On sales
+    gst_hst_paid = 0  # On purchases
+    total_revenue = 0
+    total_deductible_expenses = 0
+    total_non_deductible = 0
 
     for t in transactions:
         if t.category == "revenue":
-            total_revenue += t.amount
-            if t.tax_amount:
-                gst_hst_collected += t.tax_amount
+            total_revenue += _cents(t.amount)
+            gst_hst_collected += _cents(t.tax_amount)
         elif t.category == "expense":
             if t.tax_deductible:
-                total_deductible_expenses += t.amount
+                total_deductible_expenses += _cents(t.amount)
             else:
-                total_non_deductible += t.amount
+                total_non_deductible += _cents(t.amount)
 
-            if t.tax_amount:
-                gst_hst_paid += t.tax_amount
+            gst_hst_paid += _cents(t.tax_amount)
 
     net_gst_hst = gst_hst_collected - gst_hst_paid
     taxable_income = total_revenue - total_deductible_expenses
@@ -154,20 +159,20 @@ async def tax_summary(
     return {
         "tax_year": year,
         "revenue": {
-            "total": round(total_revenue, 2),
+            "total": _dollars(total_revenue),
         },
         "expenses": {
-            "deductible": round(total_deductible_expenses, 2),
-            "non_deductible": round(total_non_deductible, 2),
-            "total": round(total_deductible_expenses + total_non_deductible, 2),
+            "deductible": _dollars(total_deductible_expenses),
+            "non_deductible": _dollars(total_non_deductible),
+            "total": _dollars(total_deductible_expenses + total_non_deductible),
         },
         "gst_hst": {
-            "collected": round(gst_hst_collected, 2),
-            "paid": round(gst_hst_paid, 2),
-            "net_owing": round(net_gst_hst, 2),
+            "collected": _dollars(gst_hst_collected),
+            "paid": _dollars(gst_hst_paid),
+            "net_owing": _dollars(net_gst_hst),
             "note": "Positive means you owe CRA, negative means you get a refund"
         },
-        "taxable_income": round(taxable_income, 2),
+        "taxable_income": _dollars(taxable_income),
     }
 
 
@@ -177,80 +182,110 @@ async def monthly_summary(
     db: Session = Depends(get_db)
 ):
     """Get monthly revenue and expenses summary for a year."""
-    start_date = datetime(year, 1, 1)
-    end_date = datetime(year, 12, 31, 23, 59, 59)
-
     # Get all transactions for the year
     transactions = db.query(Transaction).filter(
-        Transaction.transaction_date >= start_date,
-        Transaction.transaction_date <= end_date
+        *Transaction.date_between(date(year, 1, 1), date(year, 12, 31))
     ).all()
 
-    # Group by month
-    monthly_data = defaultdict(lambda: {"revenue": 0.0, "expenses": 0.0})
+    # Group by month (summed in integer cents)
+    monthly_data = defaultdict(lambda: {"revenue": 0, "expenses": 0})
 
     for t in transactions:
         month = t.transaction_date.month
         if t.category == "revenue":
-            monthly_data[month]["revenue"] += t.amount
+            monthly_data[month]["revenue"] += _cents(t.amount)
         elif t.category == "expense":
-            monthly_data[month]["expenses"] += t.amount
+            monthly_data[month]["expenses"] += _cents(t.amount)
 
     # Format response
     months = []
+    total_revenue = 0
+    total_expenses = 0
     for m in range(1, 13):
         data = monthly_data[m]
-        net = data["revenue"] - data["expenses"]
+        total_revenue += data["revenue"]
+        total_expenses += data["expenses"]
         months.append({
             "month": m,
             "month_name": datetime(year, m, 1).strftime("%B"),
-            "revenue": round(data["revenue"], 2),
-            "expenses": round(data["expenses"], 2),
-            "net_income": round(net, 2),
+            "revenue": _dollars(data["revenue"]),
+            "expenses": _dollars(data["expenses"]),
+            "net_income": _dollars(data["revenue"] - data["expenses"]),
         })
 
-    total_revenue = sum(m["revenue"] for m in months)
-    total_expenses = sum(m["expenses"] for m in months)
-
     return {
         "year": year,
         "months": months,
         "totals": {
-            "revenue": round(total_revenue, 2),
-            "expenses": round(total_expenses, 2),
-            "net_income": round(total_revenue - total_expenses, 2),
+            "revenue": _dollars(total_revenue),
+            "expenses": _dollars(total_expenses),
+            "net_income": _dollars(total_revenue - total_expenses),
         }
     }
 
 
-@router.get("/dashboard")
-async def dashboard_stats(db: Session = Depends(get_db)):
-    """
-    Get key dashboard statistics and metrics.
-    """
-    # Get current month stats
-    now = datetime.now()
-    month_start = datetime(now.year, now.month, 1)
+def _with_session(query_fn):
+    """Run a read-only query function on its own short-lived session.
+    Sessions are not thread-safe, so each concurrent query gets its own."""
+    db = SessionLocal()
+    try:
+        return query_fn(db)
+    finally:
+        db.close()
 
-    # Total documents
-    total_documents = db.query(func.count(Document.id)).scalar()
-    pending_review = db.query(func.count(Document.id)).filter(
-        Document.processing_status == "review_needed"
-    ).scalar()
 
-    # This month's transactions
-    month_transactions = db.query(Transaction).filter(
+def _document_counts(db: Session):
+    # Total documents and pending review in a single scan
+    return db.query(
+        func.count(Document.id),
+        func.count(Document.id).filter(Document.processing_status == "review_needed"),
+    ).one()
+
+
+def _month_totals(db: Session, month_start: datetime):
+    # Revenue and expenses since month_start, aggregated in SQL
+    return db.query(
+        func.coalesce(func.sum(case((Transaction.category == "revenue", Transaction.amount), else_=0)), 0),
+        func.coalesce(func.sum(case((Transaction.category == "expense", Transaction.amount), else_=0)), 0),
+    ).filter(
         Transaction.transaction_date >= month_start
-    ).all()
+    ).one()
 
-    month_revenue = sum(t.amount for t in month_transactions if t.category == "revenue")
-    month_expenses = sum(t.amount for t in month_transactions if t.category == "expense")
 
-    # Recent documents
+def _recent_uploads(db: Session) -> list[dict]:
     recent_docs = db.query(Document).order_by(
         Document.created_at.desc()
     ).limit(5).all()
 
+    return [
+        {
+            "id": doc.id,
+            "filename": doc.original_filename,
+            "type": doc.document_type,
+            "amount": doc.amount,
+            "status": doc.processing_status,
+            "created_at": doc.created_at.isoformat(),
+        }
+        for doc in recent_docs
+    ]
+
+
+@router.get("/dashboard")
+async def dashboard_stats():
+    """
+    Get key dashboard statistics and metrics.
+    The independent queries run concurrently in worker threads.
+    """
+    # Get current month stats
+    now = datetime.now()
+    month_start = datetime(now.year, now.month, 1)
+
+    (total_documents, pending_review), (month_revenue, month_expenses), recent_uploads = await asyncio.gather(
+        asyncio.to_thread(_with_session, _document_counts),
+        asyncio.to_thread(_with_session, lambda db: _month_totals(db, month_start)),
+        asyncio.to_thread(_with_session, _recent_uploads),
+    )
+
     return {
         "documents": {
             "total": total_documents,
@@ -261,17 +296,7 @@ async def dashboard_stats(db: Session = Depends(get_db)):
             "expenses": round(month_expenses, 2),
             "net_income": round(month_revenue - month_expenses, 2),
         },
-        "recent_uploads": [
-            {
-                "id": doc.id,
-                "filename": doc.original_filename,
-                "type": doc.document_type,
-                "amount": doc.amount,
-                "status": doc.processing_status,
-                "created_at": doc.created_at.isoformat(),
-            }
-            for doc in recent_docs
-        ],
+        "recent_uploads": recent_uploads,
     }
 
 
@@ -279,30 +304,13 @@ async def dashboard_stats(db: Session = Depends(get_db)):
 
 def _account_balance_at(db: Session, account_id: int, as_of: date, normal_balance: str) -> float:
     """Calculate an account's balance from journal entries up to a date."""
-    result = db.query(
-        func.coalesce(func.sum(JournalEntryLine.debit), 0).label("d"),
-        func.coalesce(func.sum(JournalEntryLine.credit), 0).label("c"),
-    ).join(JournalEntry).filter(
-        JournalEntryLine.account_id == account_id,
-        JournalEntry.is_posted == True,
-        JournalEntry.entry_date <= as_of,
-    ).first()
-    d, c = result.d or 0, result.c or 0
+    d, c = account_activity(db, account_id, None, as_of)
     return (d - c) if normal_balance == "debit" else (c - d)
 
 
 def _account_balance_range(db: Session, account_id: int, start: date, end: date, normal_balance: str) -> float:
     """Calculate an account's activity within a date range."""
-    result = db.query(
-        func.coalesce(func.sum(JournalEntryLine.debit), 0).label("d"),
-        func.coalesce(func.sum(JournalEntryLine.credit), 0).label("c"),
-    ).join(JournalEntry).filter(
-        JournalEntryLine.account_id == account_id,
-        JournalEntry.is_posted == True,
-        JournalEntry.entry_date >= start,
-        JournalEntry.entry_date <= end,
-    ).first()
-    d, c = result.d or 0, result.c or 0
+    d, c = account_activity(db, account_id, start, end)
     return (d - c) if normal_balance == "debit" else (c - d)
 
 
@@ -387,16 +395,7 @@ async def trial_balance(
     total_credit = 0.0
 
     for acct in accounts:
-        result = db.query(
-            func.coalesce(func.sum(JournalEntryLine.debit), 0).label("d"),
-            func.coalesce(func.sum(JournalEntryLine.credit), 0).label("c"),
-        ).join(JournalEntry).filter(
-            JournalEntryLine.account_id == acct.id,
-            JournalEntry.is_posted == True,
-            JournalEntry.entry_date <= as_of_date,
-        ).first()
-
-        d, c = result.d or 0, result.c or 0
+        d, c = account_activity(db, acct.id, None, as_of_date)
         net = d - c
 
         if abs(net) < 0.01:
@@ -433,51 +432,69 @@ async def general_ledger(
     end_date: date = Query(...),
     db: Session = Depends(get_db),
 ):
-    """Get all journal entry lines for a specific account in a date range."""
+    """Get all journal entry lines for a specific account in a date range.
+
+    The entries are streamed from a server-side cursor in batches, so a busy
+    account does not have to be materialized in memory before serialization.
+    """
     account = db.query(Account).filter(Account.id == account_id).first()
     if not account:
         from fastapi import HTTPException
         raise HTTPException(status_code=404, detail="Account not found")
 
-    lines = (
-        db.query(JournalEntryLine)
-        .join(JournalEntry)
-        .filter(
-            JournalEntryLine.account_id == account_id,
-            JournalEntry.is_posted == True,
-            JournalEntry.entry_date >= start_date,
-            JournalEntry.entry_date <= end_date,
-        )
-        .order_by(JournalEntry.entry_date, JournalEntry.id)
-        .all()
-    )
-
-    # Opening balance (before start_date)
-    opening = _account_balance_at(db, account_id, date(start_date.year, start_date.month, start_date.day - 1) if start_date.day > 1 else start_date, account.normal_balance or "debit")
+    # Opening balance: all posted activity strictly before start_date
+    opening = _account_balance_at(db, account_id, start_date - timedelta(days=1), account.normal_balance or "debit")
 
-    running = opening
-    entries = []
-    for line in lines:
-        if account.normal_balance == "debit":
-            running += line.debit - line.credit
-        else:
-            running += line.credit - line.debit
-        entries.append({
-            "date": line.journal_entry.entry_date.isoformat(),
-            "description": line.description or line.journal_entry.description,
-            "reference": line.journal_entry.reference,
-            "debit": round(line.debit, 2),
-            "credit": round(line.credit, 2),
-            "balance": round(running, 2),
-        })
-
-    return {
+    header = orjson.dumps({
         "account": {"id": account.id, "code": account.code, "name": account.name, "account_type": account.account_type},
         "period": {"start": start_date.isoformat(), "end": end_date.isoformat()},
         "opening_balance": round(opening, 2),
-        "entries": entries,
-        "closing_balance": round(running, 2),
-    }
+    })
+    debit_normal = account.normal_balance == "debit"
+
+    def generate():
+        stream_db = SessionLocal()
+        try:
+            lines = (
+                stream_db.query(
+                    JournalEntry.entry_date,
+                    JournalEntryLine.description,
+                    JournalEntry.description.label("entry_description"),
+                    JournalEntry.reference,
+                    JournalEntryLine.debit,
+                    JournalEntryLine.credit,
+                )
+                .join(JournalEntry)
+                .filter(
+                    JournalEntryLine.account_id == account_id,
+                    JournalEntry.is_posted == True,
+                    JournalEntry.entry_date >= start_date,
+                    JournalEntry.entry_date <= end_date,
+                )
+                .order_by(JournalEntry.entry_date, JournalEntry.id)
+                .yield_per(1000)
+            )
+
+            running = opening
+            yield header[:-1] + b',"entries":['
+            for i, line in enumerate(lines):
+                if debit_normal:
+                    running += line.debit - line.credit
+                else:
+                    running += line.credit - line.debit
+                yield (b"," if i else b"") + orjson.dumps({
+                    "date": line.entry_date.isoformat(),
+                    "description": line.description or line.entry_description,
+                    "reference": line.reference,
+                    "debit": round(line.debit, 2),
+                    "credit": round(line.credit, 2),
+                    "balance": round(running, 2),
+                })
+            yield b'],"closing_balance":' + orjson.dumps(round(running, 2)) + b"}"
+        finally:
+            stream_db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
 
 
 @router.get("/ar-aging")
@@ -557,6 +574,29 @@ async def gst_worksheet(
     }
 
 
+# --- T2125 result cache ---
+# Keyed by (year, ledger version); the version changes whenever a posted
+# journal entry in that year is added, removed or updated, or any account
+# (name, tax_code, active flag) changes.
+T2125_CACHE_TTL_SECONDS = 300
+T2125_CACHE_MAX_ENTRIES = 32
+_t2125_cache: dict[tuple, tuple[float, dict]] = {}
+
+
+def _t2125_version(db: Session, start: date, end: date) -> tuple:
+    entries = db.query(
+        func.count(JournalEntry.id),
+        func.max(JournalEntry.id),
+        func.max(JournalEntry.updated_at),
+    ).filter(
+        JournalEntry.is_posted == True,
+        JournalEntry.entry_date >= start,
+        JournalEntry.entry_date <= end,
+    ).one()
+    accounts = db.query(func.count(Account.id), func.max(Account.updated_at)).one()
+    return tuple(entries) + tuple(accounts)
+
+
 @router.get("/t2125")
 async def t2125_worksheet(
     year: int = Query(..., description="Tax year"),
@@ -567,6 +607,11 @@ async def t2125_worksheet(
     start = date(year, 1, 1)
     end = date(year, 12, 31)
 
+    cache_key = (year, _t2125_version(db, start, end))
+    cached = _t2125_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < T2125_CACHE_TTL_SECONDS:
+        return cached[1]
+
     # Revenue
     revenue_accounts = db.query(Account).filter(Account.account_type == "revenue", Account.is_active == True).all()
     total_revenue = 0.0
@@ -602,7 +647,7 @@ async def t2125_worksheet(
 
     net_income = total_revenue - total_expenses
 
-    return {
+    result = {
         "tax_year": year,
         "gross_income": {
             "line_8000": round(total_revenue, 2),
@@ -614,3 +659,8 @@ async def t2125_worksheet(
         },
         "net_income": round(net_income, 2),
     }
+
+    if len(_t2125_cache) >= T2125_CACHE_MAX_ENTRIES:
+        _t2125_cache.pop(next(iter(_t2125_cache)))
+    _t2125_cache[cache_key] = (time.monotonic(), result)
+    return result
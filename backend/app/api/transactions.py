@@ -2,15 +2,22 @@
 API endpoints for transaction management.
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy import insert
 from typing import Optional
-from datetime import datetime, date
+from datetime import date
 from pydantic import BaseModel, Field, field_validator
+import orjson
 
-from app.db import get_db
-from app.models.transaction import Transaction
+from app.db import get_db, SessionLocal
+from app.models.transaction import Transaction, day_start
 from app.models.document import Document
-from app.services.journal_service import create_je_for_transaction, delete_je_for_transaction
+from app.services.journal_service import (
+    active_accounts_by_code,
+    create_je_for_transaction,
+    delete_je_for_transaction,
+)
 
 router = APIRouter()
 
@@ -44,7 +51,7 @@ async def create_transaction(
 ):
     """Create a new transaction manually."""
     transaction = Transaction(
-        transaction_date=datetime.combine(transaction_data.transaction_date, datetime.min.time()),
+        transaction_date=day_start(transaction_data.transaction_date),
         description=transaction_data.description,
         amount=transaction_data.amount,
         category=transaction_data.category,
@@ -73,6 +80,83 @@ async def create_transaction(
     }
 
 
+class TransactionBulkCreate(BaseModel):
+    """Schema for creating many transactions in one request."""
+    items: list[TransactionCreate] = Field(..., min_length=1, max_length=1000)
+
+
+@router.post("/bulk")
+async def create_transactions_bulk(
+    bulk_data: TransactionBulkCreate,
+    db: Session = Depends(get_db)
+):
+    """Create many transactions with a single batched INSERT."""
+    rows = [
+        {
+            "transaction_date": day_start(t.transaction_date),
+            "description": t.description,
+            "amount": t.amount,
+            "category": t.category,
+            "subcategory": t.subcategory,
+            "counterparty_name": t.counterparty_name,
+            "tax_amount": t.tax_amount or 0.0,
+            "tax_rate": t.tax_rate,
+            "payment_method": t.payment_method,
+            "document_id": t.document_id,
+            "created_by": "manual_entry",
+        }
+        for t in bulk_data.items
+    ]
+
+    # Batched executemany only promises RETURNING rows in parameter order when
+    # asked, and the ids in the response are matched to the items by position
+    transactions = db.scalars(
+        insert(Transaction).returning(Transaction, sort_by_parameter_order=True), rows
+    ).all()
+
+    # Auto-create journal entries, looking the chart of accounts up once
+    account_cache = active_accounts_by_code(db)
+    for transaction in transactions:
+        create_je_for_transaction(db, transaction, account_cache)
+
+    db.commit()
+
+    return {
+        "ids": [t.id for t in transactions],
+        "created": len(transactions),
+        "message": f"{len(transactions)} transactions created successfully",
+    }
+
+
+def _filtered_transactions(
+    db: Session,
+    category: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
+):
+    query = db.query(Transaction)
+
+    if category:
+        query = query.filter(Transaction.category == category)
+
+    return query.filter(*Transaction.date_between(start_date, end_date))
+
+
+def _serialize_transaction_row(t: Transaction) -> dict:
+    return {
+        "id": t.id,
+        "date": t.transaction_date.date().isoformat(),
+        "description": t.description,
+        "amount": t.amount,
+        "category": t.category,
+        "subcategory": t.subcategory,
+        "counterparty": t.counterparty_name,
+        "tax_amount": t.tax_amount,
+        "payment_method": t.payment_method,
+        "created_by": t.created_by,
+    }
+
+
 @router.get("/")
 async def list_transactions(
     skip: int = 0,
@@ -83,39 +167,42 @@ async def list_transactions(
     db: Session = Depends(get_db)
 ):
     """List all transactions with optional filtering."""
-    query = db.query(Transaction)
-
-    if category:
-        query = query.filter(Transaction.category == category)
-
-    if start_date:
-        query = query.filter(Transaction.transaction_date >= datetime.combine(start_date, datetime.min.time()))
-
-    if end_date:
-        query = query.filter(Transaction.transaction_date <= datetime.combine(end_date, datetime.max.time()))
+    query = _filtered_transactions(db, category, start_date, end_date)
 
     transactions = query.order_by(Transaction.transaction_date.desc()).offset(skip).limit(limit).all()
 
     return {
         "total": query.count(),
-        "transactions": [
-            {
-                "id": t.id,
-                "date": t.transaction_date.date().isoformat(),
-                "description": t.description,
-                "amount": t.amount,
-                "category": t.category,
-                "subcategory": t.subcategory,
-                "counterparty": t.counterparty_name,
-                "tax_amount": t.tax_amount,
-                "payment_method": t.payment_method,
-                "created_by": t.created_by,
-            }
-            for t in transactions
-        ]
+        "transactions": [_serialize_transaction_row(t) for t in transactions]
     }
 
 
+@router.get("/export")
+async def export_transactions(
+    category: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+):
+    """Stream all matching transactions as a JSON array, without pagination.
+
+    Rows are fetched in batches over a server-side cursor, so memory stays
+    bounded regardless of how many transactions match.
+    """
+    def generate():
+        db = SessionLocal()
+        try:
+            query = _filtered_transactions(db, category, start_date, end_date)
+            rows = query.order_by(Transaction.transaction_date.desc()).yield_per(1000)
+            yield b"["
+            for i, t in enumerate(rows):
+                yield (b"," if i else b"") + orjson.dumps(_serialize_transaction_row(t))
+            yield b"]"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+
 @router.get("/{transaction_id}")
 async def get_transaction(transaction_id: int, db: Session = Depends(get_db)):
     """Get detailed information about a specific transaction."""
@@ -168,7 +255,7 @@ async def update_transaction(
         raise HTTPException(status_code=404, detail="Transaction not found")
 
     # Update fields
-    transaction.transaction_date = datetime.combine(transaction_data.transaction_date, datetime.min.time())
+    transaction.transaction_date = day_start(transaction_data.transaction_date)
     transaction.description = transaction_data.description
     transaction.amount = transaction_data.amount
     transaction.category = transaction_data.category
@@ -1,9 +1,9 @@
 """
 Application configuration settings loaded from environment variables.
 """
-from pydantic_settings import BaseSettings
+from functools import lru_cache
+from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
-from typing import List
 
 
 class Settings(BaseSettings):
@@ -22,6 +22,11 @@ class Settings(BaseSettings):
     # Database
     database_url: str = Field(..., env="DATABASE_URL")
     database_echo: bool = False
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800  # seconds
+    db_pool_timeout: int = 30  # seconds
+    db_query_cache_size: int = 1200  # compiled SQL statements kept per engine
 
     # Ollama
     ollama_base_url: str = Field(default="http://localhost:11434", env="OLLAMA_BASE_URL")
@@ -44,7 +49,7 @@ class Settings(BaseSettings):
     # File Upload
     upload_dir: str = "../uploads/documents"
     max_upload_size: int = 10485760  # 10MB
-    allowed_extensions: List[str] = ["pdf", "png", "jpg", "jpeg", "csv", "xlsx"]
+    allowed_extensions: tuple[str, ...] = ("pdf", "png", "jpg", "jpeg", "csv", "xlsx")
 
     # Canadian Tax Settings
     tax_year: int = 2024
@@ -63,16 +68,32 @@ class Settings(BaseSettings):
 
     # AI Settings
     ai_model: str = "llama3.2:3b"
+    ai_fast_model: str = ""  # e.g. "llama3.2:1b" for categorization; empty uses ai_model
     ai_temperature: float = 0.1
     ai_max_tokens: int = 4000
+    ai_keep_alive: str = "30m"  # how long Ollama keeps the model (and prompt cache) loaded
+    ai_max_concurrency: int = 4  # in-flight Ollama requests per worker
+    ai_max_retries: int = 4  # retries on 429/5xx or dropped connections
+    ai_cache_dir: str = "../uploads/ai_cache"  # extraction results by file hash; empty disables
 
     # Logging
     log_level: str = "INFO"
 
-    class Config:
-        env_file = ".env"
-        case_sensitive = False
+    # Settings are read once at startup and never mutated afterwards
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        case_sensitive=False,
+        extra="ignore",
+        validate_default=False,
+        frozen=True,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse the environment once per process and reuse the result."""
+    return Settings()
 
 
 # Global settings instance
-settings = Settings()
+settings = get_settings()
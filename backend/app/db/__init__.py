@@ -1,21 +1,64 @@
 """Database configuration and session management."""
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine, event, func, inspect, select, Numeric, Float
+from sqlalchemy.orm import sessionmaker, Session, DeclarativeBase
+from sqlalchemy.pool import StaticPool
 from app.config import settings
 
+
+def _engine_options(url: str) -> dict:
+    """Connection pool options for the configured database."""
+    if url.startswith("sqlite"):
+        # SQLite (local dev/tests) ignores server pool sizing; allow the
+        # connection to be shared with FastAPI's worker threads instead.
+        options = {"connect_args": {"check_same_thread": False}}
+        if url in ("sqlite://", "sqlite:///:memory:"):
+            options["poolclass"] = StaticPool
+        return options
+    return {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_timeout": settings.db_pool_timeout,
+    }
+
+
+DATABASE_URL = settings.database_url
+
 # Create database engine
 engine = create_engine(
-    settings.database_url,
+    DATABASE_URL,
     echo=settings.database_echo,
     pool_pre_ping=True,
+    query_cache_size=settings.db_query_cache_size,
+    **_engine_options(DATABASE_URL),
 )
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine, "connect")
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        # Child rows rely on ON DELETE CASCADE (passive_deletes), which SQLite
+        # only honours with foreign keys switched on per connection.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
 
-# Base class for models
-Base = declarative_base()
+# Create session factory. Endpoints commit explicitly and serialize the
+# objects they just wrote, so keep loaded state after commit instead of
+# re-selecting every row on first attribute access.
+SessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine,
+)
+
+class Base(DeclarativeBase):
+    """Base class for models."""
+
+# Column types for currency amounts and tax rates: exact NUMERIC storage in
+# the database, plain floats on the Python side so existing arithmetic and
+# JSON serialization are unchanged. SQLite has no exact decimal type and
+# would hand back whole amounts as ints, so it keeps REAL columns.
+Money = Numeric(14, 2, asdecimal=False).with_variant(Float(), "sqlite")
+Rate = Numeric(6, 4, asdecimal=False).with_variant(Float(), "sqlite")
+UnitPrice = Numeric(14, 4, asdecimal=False).with_variant(Float(), "sqlite")
 
 
 def get_db() -> Session:
@@ -30,23 +73,57 @@ def get_db() -> Session:
         db.close()
 
 
-def init_db():
-    """Initialize database tables and seed default data."""
-    from app.models import (
-        Document, Transaction, Customer, Invoice, InvoiceItem,
-        Account, JournalEntry, JournalEntryLine,
-        Bill, BillItem, BillPayment,
-        BankAccount, BankTransaction,
-        GSTFilingPeriod,
+def _duplicate_keys(index) -> int:
+    """Number of key values that occur more than once in an index's columns."""
+    duplicates = (
+        select(*index.columns)
+        # NULLs never collide in a unique index
+        .where(*(column.isnot(None) for column in index.columns))
+        .group_by(*index.columns)
+        .having(func.count() > 1)
+        .subquery()
     )
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(duplicates)).scalar()
+
+
+def init_db():
+    """Create any missing tables, seed default data and backfill derived tables.
+
+    Runs before the app starts serving: a journal entry written before the
+    chart of accounts exists is skipped, and one written before the rollup
+    backfill would leave it looking already done.
+    """
+    import app.models  # noqa: F401 - registers every model on Base.metadata
     Base.metadata.create_all(bind=engine)
 
-    # Seed chart of accounts on first boot
+    # create_all skips indexes on tables that already exist
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            duplicates = _duplicate_keys(index) if index.unique else 0
+            if duplicates:
+                # Older databases had no constraint; leave the duplicates for
+                # someone to review rather than refusing to start
+                print(f"⚠️  Not creating unique index {index.name}: "
+                      f"{duplicates} duplicate keys in {table.name}")
+                continue
+            index.create(bind=engine, checkfirst=True)
+
     from app.services.coa_seed import seed_chart_of_accounts
+    from app.services.journal_service import rebuild_period_balances_if_empty
     db = SessionLocal()
     try:
+        # Seed chart of accounts on first boot
         created = seed_chart_of_accounts(db)
         if created > 0:
             print(f"  📊 Seeded {created} default accounts in Chart of Accounts")
+
+        # Backfill the monthly balance rollup for databases that predate it
+        if rebuild_period_balances_if_empty(db):
+            print("  📊 Rebuilt monthly account balances from journal entries")
     finally:
         db.close()
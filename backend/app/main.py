@@ -3,21 +3,48 @@ Main FastAPI application for AI-Powered Accountant.
 """
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from app.config import settings
-from app.db import init_db
+from contextlib import asynccontextmanager
+from sqlalchemy import text
+from app.db import engine, init_db
 from app.api.deps import get_current_user
+import asyncio
 import os
 
 # Import routers
 from app.api import auth, documents, transactions, reports, customers, invoices, accounts, journal_entries, bills, bank_accounts
 
+def _warm_pool():
+    """Open a pooled connection so the first request doesn't pay for it."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create tables and seed default data before serving requests."""
+    await asyncio.gather(asyncio.to_thread(init_db), asyncio.to_thread(_warm_pool))
+    print(f"✅ {settings.app_name} v{settings.app_version} started")
+    yield
+    await documents.close_ai_processor()
+    engine.dispose()
+
+
+# API docs and the OpenAPI schema are only served outside production
+_docs_enabled = settings.environment != "production"
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     version=settings.app_version,
     description="AI-powered accounting system for Canadian businesses",
-    docs_url=None,     # Disable Swagger UI in production
-    redoc_url=None,    # Disable ReDoc in production
+    docs_url="/docs" if _docs_enabled else None,
+    redoc_url="/redoc" if _docs_enabled else None,
+    openapi_url="/openapi.json" if _docs_enabled else None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -29,15 +56,13 @@ app.add_middleware(
     allow_headers=["Content-Type"],
 )
 
-# Create upload directory if it doesn't exist
-os.makedirs(settings.upload_dir, exist_ok=True)
+# Compress larger JSON bodies (reports, exports)
+app.add_middleware(GZipMiddleware, minimum_size=1024)
 
+UPLOAD_DIR = settings.upload_dir
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize database on startup."""
-    init_db()
-    print(f"✅ {settings.app_name} v{settings.app_version} started")
+# Create upload directory if it doesn't exist
+os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
 @app.get("/")
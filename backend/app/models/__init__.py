@@ -4,6 +4,7 @@ from .transaction import Transaction
 from .customer import Customer
 from .invoice import Invoice, InvoiceItem
 from .account import Account
+from .account_balance import AccountPeriodBalance
 from .journal_entry import JournalEntry, JournalEntryLine
 from .bill import Bill, BillItem, BillPayment
 from .bank_account import BankAccount, BankTransaction
@@ -11,7 +12,7 @@ from .gst_filing import GSTFilingPeriod
 
 __all__ = [
     "Document", "Transaction", "Customer", "Invoice", "InvoiceItem",
-    "Account", "JournalEntry", "JournalEntryLine",
+    "Account", "AccountPeriodBalance", "JournalEntry", "JournalEntryLine",
     "Bill", "BillItem", "BillPayment",
     "BankAccount", "BankTransaction",
     "GSTFilingPeriod",
@@ -0,0 +1,23 @@
+"""Monthly account balance rollup derived from posted journal entry lines."""
+from sqlalchemy import Column, Integer, BigInteger, ForeignKey
+from app.db import Base
+
+
+class AccountPeriodBalance(Base):
+    """Posted debit/credit totals per account per calendar month, in cents.
+
+    Maintained by the journal service whenever journal entries or lines are
+    flushed, so reports can sum a handful of monthly rows instead of scanning
+    every journal line.
+    """
+
+    __tablename__ = "account_period_balances"
+
+    account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    debit_cents = Column(BigInteger, nullable=False, default=0)
+    credit_cents = Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AccountPeriodBalance(account={self.account_id}, period={self.year}-{self.month:02d})>"
@@ -1,8 +1,8 @@
 """Bank Account and Bank Transaction models."""
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Date, ForeignKey, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Date, ForeignKey, Boolean, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from app.db import Base
+from app.db import Base, Money
 
 
 class BankAccount(Base):
@@ -20,8 +20,8 @@ class BankAccount(Base):
     # Link to Chart of Accounts
     gl_account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
 
-    opening_balance = Column(Float, default=0.0)
-    current_balance = Column(Float, default=0.0)
+    opening_balance = Column(Money, default=0.0)
+    current_balance = Column(Money, default=0.0)
     is_active = Column(Boolean, default=True)
 
     created_at = Column(DateTime, server_default=func.now())
@@ -29,21 +29,31 @@ class BankAccount(Base):
 
     # Relationships
     gl_account = relationship("Account", foreign_keys=[gl_account_id])
-    transactions = relationship("BankTransaction", back_populates="bank_account", cascade="all, delete-orphan")
+    transactions = relationship("BankTransaction", back_populates="bank_account", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class BankTransaction(Base):
     """Model for imported bank transactions."""
 
     __tablename__ = "bank_transactions"
+    __table_args__ = (
+        Index("ix_bt_account_date", "bank_account_id", "transaction_date"),
+        # Partial: only the (small) unreconciled backlog is indexed
+        Index(
+            "ix_bt_unreconciled", "bank_account_id", "transaction_date",
+            postgresql_where=text("is_reconciled = false"),
+            sqlite_where=text("is_reconciled = 0"),
+        ),
+        Index("ix_bt_account_import_hash", "bank_account_id", "import_hash", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     bank_account_id = Column(Integer, ForeignKey("bank_accounts.id", ondelete="CASCADE"), nullable=False)
 
     transaction_date = Column(Date, nullable=False)
     description = Column(String(500), nullable=False)
-    amount = Column(Float, nullable=False)  # Positive = deposit, negative = withdrawal
-    balance = Column(Float, nullable=True)  # Running balance from bank statement
+    amount = Column(Money, nullable=False)  # Positive = deposit, negative = withdrawal
+    balance = Column(Money, nullable=True)  # Running balance from bank statement
     reference = Column(String(200))  # Cheque number, reference from bank
 
     # Categorization
@@ -54,7 +64,7 @@ class BankTransaction(Base):
     journal_entry_id = Column(Integer, ForeignKey("journal_entries.id"), nullable=True)
 
     # Dedup
-    import_hash = Column(String(64), index=True)  # SHA256 of date+desc+amount for dedup
+    import_hash = Column(String(64))  # SHA256 of date+desc+amount for dedup
 
     created_at = Column(DateTime, server_default=func.now())
 
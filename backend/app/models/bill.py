@@ -1,14 +1,23 @@
 """Bill, BillItem, and BillPayment models for accounts payable."""
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Date, ForeignKey, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from app.db import Base
+from app.db import Base, Money, Rate, UnitPrice
 
 
 class Bill(Base):
     """Model for vendor bills (accounts payable)."""
 
     __tablename__ = "bills"
+    __table_args__ = (
+        Index("ix_bills_vendor_status", "vendor_id", "status"),
+        Index("ix_bills_status_due", "status", "due_date"),
+        Index(
+            "ix_bills_open", "vendor_id", "due_date",
+            postgresql_where=text("status IN ('draft', 'received', 'overdue')"),
+            sqlite_where=text("status IN ('draft', 'received', 'overdue')"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     bill_number = Column(String(50), unique=True, nullable=False, index=True)
@@ -24,11 +33,11 @@ class Bill(Base):
     status = Column(String(20), default="draft", nullable=False)
 
     # Financials
-    subtotal = Column(Float, default=0.0, nullable=False)
-    gst_rate = Column(Float, default=0.0)  # 0.0 or 0.05
-    gst_amount = Column(Float, default=0.0)
-    total = Column(Float, default=0.0, nullable=False)
-    amount_paid = Column(Float, default=0.0, nullable=False)
+    subtotal = Column(Money, default=0.0, nullable=False)
+    gst_rate = Column(Rate, default=0.0)  # 0.0 or 0.05
+    gst_amount = Column(Money, default=0.0)
+    total = Column(Money, default=0.0, nullable=False)
+    amount_paid = Column(Money, default=0.0, nullable=False)
 
     # Notes
     notes = Column(Text)
@@ -47,12 +56,14 @@ class Bill(Base):
         "BillItem",
         back_populates="bill",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         order_by="BillItem.id",
     )
     payments = relationship(
         "BillPayment",
         back_populates="bill",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         order_by="BillPayment.id",
     )
 
@@ -70,8 +81,8 @@ class BillItem(Base):
 
     description = Column(String(500), nullable=False)
     quantity = Column(Float, nullable=False, default=1.0)
-    unit_price = Column(Float, nullable=False)
-    amount = Column(Float, nullable=False)  # quantity * unit_price
+    unit_price = Column(UnitPrice, nullable=False)
+    amount = Column(Money, nullable=False)  # quantity * unit_price
 
     # Expense account for this line item (optional, overrides bill-level)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
@@ -93,7 +104,7 @@ class BillPayment(Base):
     bill_id = Column(Integer, ForeignKey("bills.id", ondelete="CASCADE"), nullable=False)
 
     payment_date = Column(Date, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     payment_method = Column(String(50), default="bank_transfer")
     reference = Column(String(100))
     notes = Column(Text)
@@ -3,7 +3,7 @@ Document model for storing uploaded financial documents.
 """
 from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Boolean, JSON
 from sqlalchemy.sql import func
-from app.db import Base
+from app.db import Base, Money, Rate
 
 
 class Document(Base):
@@ -22,11 +22,11 @@ class Document(Base):
     document_type = Column(String(100))  # receipt, invoice, bank_statement, etc.
     category = Column(String(100))  # office_supplies, meals, travel, etc.
     vendor_name = Column(String(255))
-    amount = Column(Float)
+    amount = Column(Money)
     currency = Column(String(10), default="CAD")
     transaction_date = Column(DateTime)
-    tax_amount = Column(Float)  # GST/HST amount
-    tax_rate = Column(Float)  # Tax rate applied
+    tax_amount = Column(Money)  # GST/HST amount
+    tax_rate = Column(Rate)  # Tax rate applied
 
     # Extracted data
     extracted_data = Column(JSON)  # Full AI extraction results
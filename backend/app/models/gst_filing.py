@@ -1,13 +1,20 @@
 """GST/HST Filing Period model for tracking tax filing obligations."""
-from sqlalchemy import Column, Integer, String, DateTime, Float, Date, Boolean, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Text, Index, text
 from sqlalchemy.sql import func
-from app.db import Base
+from app.db import Base, Money
 
 
 class GSTFilingPeriod(Base):
     """Model for tracking GST/HST filing periods and submissions."""
 
     __tablename__ = "gst_filing_periods"
+    __table_args__ = (
+        Index(
+            "ix_gst_open", "period_end",
+            postgresql_where=text("status != 'filed'"),
+            sqlite_where=text("status != 'filed'"),
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -17,11 +24,11 @@ class GSTFilingPeriod(Base):
     filing_frequency = Column(String(20), default="quarterly")  # monthly, quarterly, annual
 
     # Calculated amounts
-    gst_collected = Column(Float, default=0.0)  # Line 101 - Total GST/HST collected
-    input_tax_credits = Column(Float, default=0.0)  # Line 106 - Total ITCs
-    net_tax = Column(Float, default=0.0)  # Line 109 - Net tax (collected - ITCs)
-    installment_payments = Column(Float, default=0.0)  # Line 110
-    amount_owing = Column(Float, default=0.0)  # Line 113 - Amount owing or refund
+    gst_collected = Column(Money, default=0.0)  # Line 101 - Total GST/HST collected
+    input_tax_credits = Column(Money, default=0.0)  # Line 106 - Total ITCs
+    net_tax = Column(Money, default=0.0)  # Line 109 - Net tax (collected - ITCs)
+    installment_payments = Column(Money, default=0.0)  # Line 110
+    amount_owing = Column(Money, default=0.0)  # Line 113 - Amount owing or refund
 
     # Status tracking
     status = Column(String(20), default="draft")  # draft, calculated, filed
@@ -1,14 +1,17 @@
 """Invoice and InvoiceItem models."""
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Date, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from app.db import Base
+from app.db import Base, Money, Rate, UnitPrice
 
 
 class Invoice(Base):
     """Model for invoices."""
 
     __tablename__ = "invoices"
+    __table_args__ = (
+        Index("ix_invoices_customer_status", "customer_id", "status"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     invoice_number = Column(String(50), unique=True, nullable=False, index=True)
@@ -25,10 +28,10 @@ class Invoice(Base):
     status = Column(String(20), default="draft", nullable=False)
 
     # Financials
-    subtotal = Column(Float, default=0.0, nullable=False)
-    gst_rate = Column(Float, default=0.0)  # 0.0 or 0.05
-    gst_amount = Column(Float, default=0.0)
-    total = Column(Float, default=0.0, nullable=False)
+    subtotal = Column(Money, default=0.0, nullable=False)
+    gst_rate = Column(Rate, default=0.0)  # 0.0 or 0.05
+    gst_amount = Column(Money, default=0.0)
+    total = Column(Money, default=0.0, nullable=False)
 
     # Notes
     notes = Column(Text)
@@ -43,6 +46,7 @@ class Invoice(Base):
         "InvoiceItem",
         back_populates="invoice",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         order_by="InvoiceItem.id",
     )
 
@@ -60,8 +64,8 @@ class InvoiceItem(Base):
 
     description = Column(String(500), nullable=False)
     quantity = Column(Float, nullable=False, default=1.0)
-    unit_price = Column(Float, nullable=False)
-    amount = Column(Float, nullable=False)  # quantity * unit_price
+    unit_price = Column(UnitPrice, nullable=False)
+    amount = Column(Money, nullable=False)  # quantity * unit_price
 
     # Relationship
     invoice = relationship("Invoice", back_populates="items")
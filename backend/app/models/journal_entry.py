@@ -1,14 +1,17 @@
 """Journal Entry and Journal Entry Line models for double-entry bookkeeping."""
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Date, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Date, Boolean, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
-from app.db import Base
+from app.db import Base, Money
 
 
 class JournalEntry(Base):
     """Model for journal entries (double-entry bookkeeping header)."""
 
     __tablename__ = "journal_entries"
+    __table_args__ = (
+        Index("ix_je_transaction", "transaction_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     entry_date = Column(Date, nullable=False)
@@ -32,6 +35,7 @@ class JournalEntry(Base):
         "JournalEntryLine",
         back_populates="journal_entry",
         cascade="all, delete-orphan",
+        passive_deletes=True,
         order_by="JournalEntryLine.id",
     )
 
@@ -43,13 +47,16 @@ class JournalEntryLine(Base):
     """Model for journal entry line items (individual debits/credits)."""
 
     __tablename__ = "journal_entry_lines"
+    __table_args__ = (
+        Index("ix_jel_account_entry", "account_id", "journal_entry_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     journal_entry_id = Column(Integer, ForeignKey("journal_entries.id", ondelete="CASCADE"), nullable=False)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
     description = Column(String(500))
-    debit = Column(Float, default=0.0)
-    credit = Column(Float, default=0.0)
+    debit = Column(Money, default=0.0)
+    credit = Column(Money, default=0.0)
 
     # Relationships
     journal_entry = relationship("JournalEntry", back_populates="lines")
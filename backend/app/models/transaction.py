@@ -1,22 +1,34 @@
 """
 Transaction model for accounting entries.
 """
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, Boolean
+from datetime import date, datetime, timedelta
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
 from sqlalchemy.sql import func
-from app.db import Base
+from app.db import Base, Money, Rate
+
+
+def day_start(d: date) -> datetime:
+    """Midnight at the start of a calendar day, as stored in transaction_date."""
+    return datetime(d.year, d.month, d.day)
 
 
 class Transaction(Base):
     """Model for accounting transactions (double-entry bookkeeping)."""
 
     __tablename__ = "transactions"
+    __table_args__ = (
+        # Date-range reports and the date-ordered transaction list
+        Index("ix_tx_date", "transaction_date"),
+        # Category filter plus date range/order (expense reports, list filter)
+        Index("ix_tx_category_date", "category", "transaction_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
     # Transaction Details
     transaction_date = Column(DateTime, nullable=False)
     description = Column(Text, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount = Column(Money, nullable=False)
     currency = Column(String(10), default="CAD")
 
     # Categorization
@@ -25,8 +37,8 @@ class Transaction(Base):
     account_code = Column(String(50))  # Chart of accounts code
 
     # Tax Information
-    tax_amount = Column(Float, default=0.0)
-    tax_rate = Column(Float)  # GST/HST rate
+    tax_amount = Column(Money, default=0.0)
+    tax_rate = Column(Rate)  # GST/HST rate
     tax_type = Column(String(50))  # GST, HST, PST, none
     tax_deductible = Column(Boolean, default=True)
 
@@ -56,5 +68,15 @@ class Transaction(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    @classmethod
+    def date_between(cls, start: date | None = None, end: date | None = None) -> list:
+        """Index-friendly transaction_date filters covering whole days from start to end inclusive."""
+        clauses = []
+        if start:
+            clauses.append(cls.transaction_date >= day_start(start))
+        if end:
+            clauses.append(cls.transaction_date < day_start(end + timedelta(days=1)))
+        return clauses
+
     def __repr__(self):
         return f"<Transaction(id={self.id}, date={self.transaction_date}, amount={self.amount}, category={self.category})>"
@@ -1,5 +1,19 @@
 """Business logic services."""
-from .ai_processor import AIDocumentProcessor
-from .ocr import OCRService
+import importlib
+
+# OCR and the LLM client pull in Tesseract, Pillow and pdf2image. Resolve them
+# on first use so importing any service module (e.g. journal_service from a
+# router) doesn't load them at startup.
+_LAZY_EXPORTS = {
+    "AIDocumentProcessor": ".ai_processor",
+    "OCRService": ".ocr",
+}
 
 __all__ = ["AIDocumentProcessor", "OCRService"]
+
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        module = importlib.import_module(_LAZY_EXPORTS[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
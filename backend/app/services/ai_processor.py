@@ -3,77 +3,302 @@ AI-powered document processing using OCR + Ollama (Llama 3.2).
 Extracts text from documents via Tesseract OCR, then uses a text LLM
 to parse and categorize the financial information.
 """
+import asyncio
+import hashlib
 import json
 import logging
-from typing import Dict, Any
+import os
+import random
+from collections import OrderedDict
+from typing import Dict, Any, Optional
 import httpx
+import orjson
+from pydantic import BaseModel, ValidationError
 from app.config import settings
 from app.services.ocr import OCRService
 
 logger = logging.getLogger(__name__)
 
+_DECODER = json.JSONDecoder()
+
+# Extraction results kept per processor, keyed by upload content hash
+RESULT_CACHE_SIZE = 1024
+
+# Ollama responses worth retrying: overloaded, restarting or behind a proxy
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+RETRY_MAX_DELAY = 30.0
+
+# Extraction output budget: the fixed fields fit in EXTRACTION_MIN_TOKENS;
+# line items can't take more than roughly one token per 4 chars of input
+EXTRACTION_MIN_TOKENS = 800
+
+# Leading bytes each binary upload type must start with
+FILE_SIGNATURES = {
+    "pdf": (b"%PDF-",),
+    "png": (b"\x89PNG\r\n\x1a\n",),
+    "jpg": (b"\xff\xd8\xff",),
+    "jpeg": (b"\xff\xd8\xff",),
+}
+
+# Digital PDFs with at least this much embedded text skip OCR entirely
+PDF_TEXT_MIN_CHARS = 200
+
+# Concurrent categorization requests per batch; matches Ollama's default
+# OLLAMA_NUM_PARALLEL so extra requests don't just queue server-side.
+CATEGORIZE_CONCURRENCY = 4
+
+# Static instructions go in the system message and the per-call data in the
+# user message, so consecutive requests share an identical prompt prefix that
+# Ollama can reuse from its KV cache instead of re-evaluating.
+CATEGORIZE_SYSTEM_TEMPLATE = """As a Canadian accountant, categorize the business transaction you are given.
+
+Choose its expense category (one of: {categories}).
+
+Return JSON only:
+{{
+    "category": "category_name",
+    "reasoning": "brief explanation"
+}}
+"""
+
+# Tax treatment is fixed by the rules below rather than left to the model.
+# GST/HST by province or territory (the recoverable sales tax; PST/QST is not
+# claimable as an input tax credit).
+GST_ONLY = ("GST", 0.05)
+SALES_TAX_BY_PROVINCE = {
+    "ON": ("HST", 0.13),
+    "NS": ("HST", 0.15),
+    "NB": ("HST", 0.15),
+    "NL": ("HST", 0.15),
+    "PE": ("HST", 0.15),
+    "AB": GST_ONLY,
+    "BC": GST_ONLY,
+    "MB": GST_ONLY,
+    "QC": GST_ONLY,
+    "SK": GST_ONLY,
+    "NT": GST_ONLY,
+    "NU": GST_ONLY,
+    "YT": GST_ONLY,
+}
+
+# Names the model may give instead of the two-letter code
+PROVINCE_CODES = {
+    "ONTARIO": "ON",
+    "NOVA SCOTIA": "NS",
+    "NEW BRUNSWICK": "NB",
+    "NEWFOUNDLAND": "NL",
+    "NEWFOUNDLAND AND LABRADOR": "NL",
+    "PRINCE EDWARD ISLAND": "PE",
+    "PEI": "PE",
+    "ALBERTA": "AB",
+    "BRITISH COLUMBIA": "BC",
+    "MANITOBA": "MB",
+    "QUEBEC": "QC",
+    "QUÉBEC": "QC",
+    "SASKATCHEWAN": "SK",
+    "NORTHWEST TERRITORIES": "NT",
+    "NUNAVUT": "NU",
+    "YUKON": "YT",
+}
+
+# Share of an expense that is deductible; everything else is fully deductible
+DEDUCTION_PERCENTAGE = {
+    "meals_and_entertainment": 50,
+}
+
+
+def _province_code(value: Optional[str]) -> Optional[str]:
+    """Two-letter code for a Canadian province or territory, else None."""
+    if not isinstance(value, str):
+        return None
+    value = " ".join(value.replace(".", "").split()).upper()
+    value = PROVINCE_CODES.get(value, value)
+    return value if value in SALES_TAX_BY_PROVINCE else None
+
+
+class ExtractedLineItem(BaseModel):
+    description: Optional[str] = None
+    quantity: Optional[float] = None
+    unit_price: Optional[float] = None
+    total: Optional[float] = None
+
+
+class ExtractedDocument(BaseModel):
+    """Shape of the data extracted from a document.
+
+    Its JSON schema is sent as Ollama's `format`, which constrains the model
+    to emit exactly this object instead of free-form text around it.
+    """
+    document_type: Optional[str] = None
+    transaction_date: Optional[str] = None
+    amount: Optional[float] = None
+    currency: Optional[str] = None
+    description: Optional[str] = None
+    vendor_name: Optional[str] = None
+    vendor_type: Optional[str] = None
+    category: Optional[str] = None
+    subcategory: Optional[str] = None
+    vendor_province: Optional[str] = None
+    tax_amount: Optional[float] = None
+    payment_method: Optional[str] = None
+    payment_status: Optional[str] = None
+    line_items: Optional[list[ExtractedLineItem]] = None
+    confidence: float = 0.8
+    notes: Optional[str] = None
+
+
+EXTRACTION_SCHEMA = ExtractedDocument.model_json_schema()
+
+
+class _JSONObjectEnd:
+    """Incrementally detect when the first top-level JSON object is complete."""
+
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, text: str) -> bool:
+        for ch in text:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = self.depth > 0
+            elif ch == "{":
+                self.depth += 1
+            elif ch == "}" and self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
+
 
 class AIDocumentProcessor:
     """Process financial documents using OCR + Ollama text model."""
 
+    # Canadian expense categories for business. Immutable and shared by every
+    # instance; the prompts are derived from them.
+    expense_categories = (
+        "office_supplies",
+        "rent",
+        "utilities",
+        "meals_and_entertainment",
+        "travel",
+        "vehicle_expenses",
+        "professional_fees",
+        "insurance",
+        "bank_fees",
+        "advertising",
+        "software_subscriptions",
+        "equipment",
+        "repairs_and_maintenance",
+        "employee_wages",
+        "contractor_payments",
+        "inventory",
+        "shipping",
+        "taxes_and_licenses",
+        "other",
+    )
+
+    # Document types
+    document_types = (
+        "receipt",
+        "invoice",
+        "bank_statement",
+        "credit_card_statement",
+        "payroll_record",
+        "tax_document",
+        "contract",
+        "other",
+    )
+
+    _cats_joined = ", ".join(expense_categories)
+    _types_joined = ", ".join(document_types)
+
     def __init__(self):
         self.base_url = settings.ollama_base_url
         self.model = settings.ai_model
+        # Smaller model for short classification calls; defaults to the main one
+        self.fast_model = settings.ai_fast_model or settings.ai_model
         self.ocr = OCRService()
 
-        # Canadian expense categories for business
-        self.expense_categories = [
-            "office_supplies",
-            "rent",
-            "utilities",
-            "meals_and_entertainment",
-            "travel",
-            "vehicle_expenses",
-            "professional_fees",
-            "insurance",
-            "bank_fees",
-            "advertising",
-            "software_subscriptions",
-            "equipment",
-            "repairs_and_maintenance",
-            "employee_wages",
-            "contractor_payments",
-            "inventory",
-            "shipping",
-            "taxes_and_licenses",
-            "other"
-        ]
-
-        # Document types
-        self.document_types = [
-            "receipt",
-            "invoice",
-            "bank_statement",
-            "credit_card_statement",
-            "payroll_record",
-            "tax_document",
-            "contract",
-            "other"
-        ]
+        # One pooled client per processor so Ollama connections are reused
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(600.0),
+            limits=httpx.Limits(max_keepalive_connections=8),
+        )
+        # Bounds in-flight model requests across all uploads on this worker
+        self._llm_semaphore = asyncio.Semaphore(settings.ai_max_concurrency)
+
+        # The prompts only depend on the class-level lists; build them once
+        self._extraction_prompt = self._build_extraction_prompt()
+        self._categorize_prompt = CATEGORIZE_SYSTEM_TEMPLATE.format(categories=self._cats_joined)
+
+        # sha256(upload) -> successful result, so re-uploads skip OCR + LLM.
+        # Kept in memory and, when AI_CACHE_DIR is set, on disk so results
+        # survive restarts and are shared between workers. Keys are scoped to
+        # the model, prompt and schema, so changing any of them starts afresh.
+        self._result_cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+        self._cache_dir = settings.ai_cache_dir
+        self._cache_scope = hashlib.sha256(
+            self.model.encode() + b"\0"
+            + self._extraction_prompt.encode() + b"\0"
+            + orjson.dumps(EXTRACTION_SCHEMA)
+        ).hexdigest()[:16]
+        if self._cache_dir:
+            os.makedirs(self._cache_dir, exist_ok=True)
 
     async def process_document(
         self,
         file_content: bytes,
         file_type: str,
-        filename: str
+        filename: str,
+        use_cache: bool = True,
     ) -> Dict[str, Any]:
         """
         Process a financial document and extract structured data.
+
+        Identical uploads are answered from the result cache unless
+        `use_cache` is False (the fresh result still refreshes the cache).
         """
+        # Fail fast on uploads that can't produce anything, before OCR or the model
+        rejection = self._check_upload(file_content, file_type)
+        if rejection:
+            logger.info("Rejected %s without processing: %s", filename, rejection)
+            return {
+                "success": False,
+                "error": rejection,
+                "data": None,
+                "needs_review": True
+            }
+
+        cache_key = f"{self._cache_scope}_{file_type}_{hashlib.sha256(file_content).hexdigest()}"
+        if use_cache:
+            cached = self._cached_result(cache_key)
+            if cached is not None:
+                logger.info("Reusing cached extraction for %s", filename)
+                return cached
+
         try:
-            # Step 1: Extract text via OCR (images/PDFs) or decode (text files)
+            # Step 1: Extract text via OCR (images/PDFs) or decode (text files).
+            # Tesseract is blocking and CPU-bound; keep it off the event loop.
             if file_type in ['png', 'jpg', 'jpeg']:
-                extracted_text = self._ocr_image(file_content)
+                extracted_text = await asyncio.to_thread(self._ocr_image, file_content)
             elif file_type == 'pdf':
-                extracted_text = self._ocr_pdf(file_content)
+                extracted_text = await asyncio.to_thread(self._ocr_pdf, file_content)
             else:
                 extracted_text = file_content.decode('utf-8')
 
+            # Only the text is needed from here on; drop the raw upload before
+            # the (slow) LLM call
+            del file_content
+
             if not extracted_text or not extracted_text.strip():
                 return {
                     "success": False,
@@ -90,14 +315,19 @@ class AIDocumentProcessor:
             prompt = self._create_extraction_prompt()
             result = await self._process_text_document(extracted_text, prompt)
 
-            extracted_data = self._parse_ai_response(result)
+            extracted_data = self._parse_extraction(result)
+            if "error" not in extracted_data:
+                self._apply_tax_rules(extracted_data)
 
-            return {
+            processed = {
                 "success": True,
                 "data": extracted_data,
                 "confidence": extracted_data.get("confidence", 0.0),
                 "needs_review": extracted_data.get("confidence", 0.0) < 0.85
             }
+            if "error" not in extracted_data:
+                self._cache_result(cache_key, processed)
+            return processed
 
         except Exception as e:
             logger.error("AI processing error for %s: %s", filename, e)
@@ -108,35 +338,174 @@ class AIDocumentProcessor:
                 "needs_review": True
             }
 
+    def _check_upload(self, file_content: bytes, file_type: str) -> str | None:
+        """Return why an upload can't be processed, or None if it looks valid."""
+        if not file_content:
+            return "The file is empty"
+        signatures = FILE_SIGNATURES.get(file_type)
+        if signatures and not file_content.startswith(signatures):
+            return f"The file content is not a valid {file_type.upper()}"
+        return None
+
+    def _cached_result(self, key: str) -> Dict[str, Any] | None:
+        if key in self._result_cache:
+            self._result_cache.move_to_end(key)
+            return self._result_cache[key]
+        if not self._cache_dir:
+            return None
+        try:
+            with open(os.path.join(self._cache_dir, f"{key}.json"), "rb") as f:
+                result = orjson.loads(f.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+        self._remember_result(key, result)
+        return result
+
+    def _cache_result(self, key: str, result: Dict[str, Any]):
+        self._remember_result(key, result)
+        if not self._cache_dir:
+            return
+        # Write then rename, so concurrent workers never read a partial file
+        path = os.path.join(self._cache_dir, f"{key}.json")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(orjson.dumps(result))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Could not write extraction cache %s: %s", path, e)
+
+    def _remember_result(self, key: str, result: Dict[str, Any]):
+        self._result_cache[key] = result
+        self._result_cache.move_to_end(key)
+        if len(self._result_cache) > RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
+
     def _ocr_image(self, file_content: bytes) -> str:
         """Extract text from an image using Tesseract OCR."""
-        # Preprocess for better accuracy, then OCR
-        processed = self.ocr.preprocess_image(file_content)
-        return self.ocr.extract_text_from_image(processed)
+        # Preprocess for better accuracy, then OCR the in-memory result
+        return self.ocr.extract_text_from_image(file_content, preprocess=True)
 
     def _ocr_pdf(self, file_content: bytes) -> str:
-        """Extract text from a PDF by converting pages to images and OCR."""
+        """Extract text from a PDF, using OCR only when it has no text layer."""
+        text = self._try_extract_pdf_text(file_content)
+        if text is not None:
+            logger.info("PDF has a text layer (%d chars); skipping OCR", len(text))
+            return text
+
+        logger.info("PDF has no usable text layer; running OCR")
         return self.ocr.extract_text_from_pdf(file_content, max_pages=5)
 
-    async def _call_ollama(self, messages: list, timeout: float = 600.0) -> str:
-        """Make a chat request to the Ollama API."""
+    def _try_extract_pdf_text(self, file_content: bytes) -> str | None:
+        """Return the embedded text of a digital PDF, or None if it needs OCR.
+
+        Scanned PDFs have no (or only a stub) text layer; anything without a
+        reasonable amount of text and at least one digit is treated as scanned.
+        """
+        try:
+            text = self.ocr.extract_embedded_pdf_text(file_content, max_pages=5)
+        except Exception as e:
+            logger.warning("PDF text extraction failed, falling back to OCR: %s", e)
+            return None
+
+        stripped = text.strip()
+        if len(stripped) < PDF_TEXT_MIN_CHARS or not any(c.isdigit() for c in stripped):
+            return None
+        return text
+
+    async def _call_ollama(
+        self,
+        messages: list,
+        timeout: float = 600.0,
+        model: str | None = None,
+        temperature: float | None = None,
+        max_tokens: int | None = None,
+        format: dict | None = None,
+        stream: bool = False,
+    ) -> str:
+        """Make a chat request to the Ollama API.
+
+        `format` is an optional JSON schema the response must follow. With
+        `stream`, tokens are read as they are generated and the request is
+        closed as soon as the first JSON object is complete; `timeout` then
+        bounds the gap between tokens rather than the whole generation.
+        """
         payload = {
-            "model": self.model,
+            "model": model or self.model,
             "messages": messages,
-            "stream": False,
+            "stream": stream,
+            "keep_alive": settings.ai_keep_alive,
             "options": {
-                "temperature": settings.ai_temperature,
-                "num_predict": settings.ai_max_tokens,
+                "temperature": settings.ai_temperature if temperature is None else temperature,
+                "num_predict": max_tokens or settings.ai_max_tokens,
             }
         }
-
-        response = httpx.post(
-            f"{self.base_url}/api/chat",
-            json=payload,
-            timeout=httpx.Timeout(timeout)
-        )
-        response.raise_for_status()
-        return response.json()["message"]["content"]
+        if format is not None:
+            payload["format"] = format
+
+        content = orjson.dumps(payload)
+
+        async with self._llm_semaphore:
+            for attempt in range(settings.ai_max_retries + 1):
+                try:
+                    if stream:
+                        return await self._stream_chat(content, timeout)
+                    response = await self._http.post(
+                        "/api/chat",
+                        content=content,
+                        headers={"Content-Type": "application/json"},
+                        timeout=httpx.Timeout(timeout)
+                    )
+                    response.raise_for_status()
+                    return orjson.loads(response.content)["message"]["content"]
+                except (httpx.HTTPStatusError, httpx.TransportError) as e:
+                    retryable = (
+                        isinstance(e, (httpx.ConnectError, httpx.RemoteProtocolError))
+                        or (
+                            isinstance(e, httpx.HTTPStatusError)
+                            and e.response.status_code in RETRY_STATUS_CODES
+                        )
+                    )
+                    if not retryable or attempt == settings.ai_max_retries:
+                        raise
+                    # Exponential backoff with jitter so queued uploads don't retry in lockstep
+                    delay = min(RETRY_MAX_DELAY, 2 ** attempt + random.random())
+                    logger.warning(
+                        "Ollama request failed (%s); retrying in %.1fs", e, delay
+                    )
+                    await asyncio.sleep(delay)
+
+    async def _stream_chat(self, content: bytes, timeout: float) -> str:
+        """Read a streamed chat response, stopping once the JSON object closes.
+
+        Leaving the stream early disconnects from Ollama, which then stops
+        generating whatever trailing text the model would have added.
+        """
+        parts = []
+        object_end = _JSONObjectEnd()
+        async with self._http.stream(
+            "POST",
+            "/api/chat",
+            content=content,
+            headers={"Content-Type": "application/json"},
+            timeout=httpx.Timeout(timeout),
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                chunk = orjson.loads(line)
+                if "error" in chunk:
+                    raise RuntimeError(f"Ollama error: {chunk['error']}")
+                text = chunk.get("message", {}).get("content", "")
+                parts.append(text)
+                if chunk.get("done") or object_end.feed(text):
+                    break
+        return "".join(parts)
+
+    async def aclose(self):
+        """Close pooled HTTP connections to Ollama."""
+        await self._http.aclose()
 
     async def _process_text_document(
         self,
@@ -145,102 +514,106 @@ class AIDocumentProcessor:
     ) -> str:
         """Send extracted text to Ollama for structured parsing."""
         messages = [
-            {
-                "role": "user",
-                "content": f"{prompt}\n\nDocument content:\n{text_content}"
-            }
+            {"role": "system", "content": prompt},
+            {"role": "user", "content": f"Document content:\n{text_content}"},
         ]
 
-        return await self._call_ollama(messages)
+        # Size the output budget to the document: a receipt needs a few hundred
+        # tokens, a bank statement with many line items needs thousands
+        max_tokens = min(
+            settings.ai_max_tokens,
+            EXTRACTION_MIN_TOKENS + len(text_content) // 4,
+        )
+        return await self._call_ollama(
+            messages,
+            temperature=0.0,
+            max_tokens=max_tokens,
+            format=EXTRACTION_SCHEMA,
+            stream=True,
+        )
 
     def _create_extraction_prompt(self) -> str:
+        """Return the prompt for the model to extract financial data."""
+        return self._extraction_prompt
+
+    def _build_extraction_prompt(self) -> str:
         """Create the prompt for the model to extract financial data."""
-        return f"""You are an expert Canadian accountant analyzing a financial document.
-Extract all relevant financial information and return it as structured JSON.
-
-For this document, identify and extract:
-
-1. **Document Type**: One of {', '.join(self.document_types)}
-2. **Transaction Details**:
-   - Date of transaction (YYYY-MM-DD format)
-   - Total amount (numeric only)
-   - Currency (default CAD)
-   - Description/memo
-
-3. **Vendor/Customer Information**:
-   - Name of vendor or customer
-   - Type (vendor, customer, employee)
-
-4. **Expense Categorization**:
-   - Primary category (one of: {', '.join(self.expense_categories)})
-   - Is this a business expense? (true/false)
-   - Is this tax deductible in Canada? (true/false)
-
-5. **Tax Information**:
-   - GST/HST amount (if shown)
-   - Tax rate applied (if shown)
-   - Tax type (GST, HST, PST, or none)
-
-6. **Line Items** (if applicable):
-   - Each item with description, quantity, unit price, total
-
-7. **Payment Information**:
-   - Payment method (if shown): cash, credit_card, debit, bank_transfer, etc.
-   - Payment status: paid, pending, due
-
-8. **Confidence Score**:
-   - Your confidence in the extraction (0.0 to 1.0)
-   - Reasons for low confidence if any
-
-**Important Canadian Tax Rules to Consider**:
-- GST rate is 5% (federal)
-- HST rates: ON=13%, NS/NB/NL/PE=15%, BC=12%
-- Some expenses have 50% deduction limits (meals & entertainment)
-- Certain expenses are fully deductible (office supplies, utilities)
-
-Return ONLY valid JSON in this exact format:
+        return f"""You are an expert Canadian accountant. Extract the financial data from the document the user provides and return ONLY a JSON object with these keys:
+
 {{
-    "document_type": "receipt|invoice|etc",
-    "transaction_date": "YYYY-MM-DD",
-    "amount": 0.00,
-    "currency": "CAD",
-    "description": "Brief description",
-    "vendor_name": "Vendor name",
-    "vendor_type": "vendor|customer|employee",
-    "category": "category_name",
-    "subcategory": "more specific if applicable",
-    "tax_amount": 0.00,
-    "tax_rate": 0.05,
-    "tax_type": "GST|HST|PST|none",
-    "tax_deductible": true,
-    "deduction_percentage": 100,
-    "payment_method": "credit_card|cash|etc",
-    "payment_status": "paid|pending|due",
-    "line_items": [
-        {{"description": "item", "quantity": 1, "unit_price": 0.00, "total": 0.00}}
-    ],
-    "confidence": 0.95,
-    "notes": "Any important notes or reasons for low confidence"
+  "document_type": one of {self._types_joined},
+  "transaction_date": "YYYY-MM-DD",
+  "amount": total as a number,
+  "currency": "CAD" unless stated otherwise,
+  "description": brief description,
+  "vendor_name": string,
+  "vendor_type": "vendor" | "customer" | "employee",
+  "category": one of {self._cats_joined},
+  "subcategory": more specific category if applicable,
+  "vendor_province": two-letter province code from the vendor's address,
+  "tax_amount": GST/HST amount charged as a number,
+  "payment_method": "cash" | "credit_card" | "debit" | "bank_transfer" | other,
+  "payment_status": "paid" | "pending" | "due",
+  "line_items": [{{"description", "quantity", "unit_price", "total"}}],
+  "confidence": 0.0-1.0,
+  "notes": important notes or reasons for low confidence
 }}
 
-If you cannot determine a value, use null. Ensure all amounts are numeric (not strings).
+Use null for unknown values. Amounts must be numbers, not strings.
 """
 
-    def _parse_ai_response(self, response: str) -> Dict[str, Any]:
-        """Parse and validate the model's JSON response."""
+    def _parse_extraction(self, response: str) -> Dict[str, Any]:
+        """Validate a schema-constrained extraction response.
+
+        Falls back to the free-form parser for servers that ignore `format`.
+        """
         try:
-            json_start = response.find('{')
-            json_end = response.rfind('}') + 1
-            json_str = response[json_start:json_end]
+            data = ExtractedDocument.model_validate_json(response)
+        except ValidationError:
+            return self._parse_ai_response(response)
+        return data.model_dump(exclude_none=True)
+
+    def _apply_tax_rules(self, data: Dict[str, Any], sales_tax: bool = True):
+        """Fill in the tax treatment from the vendor's province and category."""
+        if sales_tax:
+            tax_amount = data.get("tax_amount")
+            if isinstance(tax_amount, bool) or not isinstance(tax_amount, (int, float)):
+                tax_amount = None
+            province = _province_code(data.get("vendor_province") or settings.province)
+            if tax_amount == 0:
+                data["tax_type"], data["tax_rate"] = "none", 0.0
+            elif tax_amount is not None and tax_amount > 0 and province:
+                data["tax_type"], data["tax_rate"] = SALES_TAX_BY_PROVINCE[province]
+            else:
+                # No tax shown, or a vendor outside Canada: don't guess a rate
+                data["tax_type"], data["tax_rate"] = None, None
 
-            data = json.loads(json_str)
+        percentage = DEDUCTION_PERCENTAGE.get(data.get("category"), 100)
+        data["deduction_percentage"] = percentage
+        data["tax_deductible"] = percentage > 0
 
-            if 'amount' in data and data['amount']:
-                data['amount'] = float(data['amount'])
-            if 'tax_amount' in data and data['tax_amount']:
-                data['tax_amount'] = float(data['tax_amount'])
-            if 'confidence' not in data:
-                data['confidence'] = 0.8
+    def _parse_ai_response(self, response: str) -> Dict[str, Any]:
+        """Parse and validate the model's JSON response."""
+        try:
+            try:
+                # Usual case: the reply is nothing but the JSON object
+                data = orjson.loads(response)
+            except orjson.JSONDecodeError:
+                # Otherwise decode the first JSON object in place and ignore
+                # any surrounding text, rather than scanning for the last
+                # brace and slicing
+                json_start = response.find('{')
+                if json_start < 0:
+                    raise json.JSONDecodeError("No JSON object found", response, 0)
+                data, _ = _DECODER.raw_decode(response, json_start)
+            if not isinstance(data, dict):
+                raise json.JSONDecodeError("Expected a JSON object", response, 0)
+
+            for key in ('amount', 'tax_amount'):
+                value = data.get(key)
+                if value:
+                    data[key] = float(value)
+            data.setdefault('confidence', 0.8)
 
             return data
 
@@ -258,26 +631,39 @@ If you cannot determine a value, use null. Ensure all amounts are numeric (not s
         vendor: str
     ) -> Dict[str, str]:
         """Categorize a transaction based on description, amount, and vendor."""
-        prompt = f"""As a Canadian accountant, categorize this business transaction:
-
-Vendor: {vendor}
-Amount: ${amount}
-Description: {description}
-
-Determine:
-1. Expense category (one of: {', '.join(self.expense_categories)})
-2. Whether it's tax deductible in Canada
-3. If it's subject to 50% deduction rule (meals & entertainment)
-
-Return JSON only:
-{{
-    "category": "category_name",
-    "tax_deductible": true,
-    "deduction_percentage": 100,
-    "reasoning": "brief explanation"
-}}
-"""
-
-        messages = [{"role": "user", "content": prompt}]
-        response = await self._call_ollama(messages, timeout=60.0)
-        return self._parse_ai_response(response)
+        messages = [
+            {"role": "system", "content": self._categorize_prompt},
+            {
+                "role": "user",
+                "content": f"Vendor: {vendor}\nAmount: ${amount}\nDescription: {description}"
+            },
+        ]
+        response = await self._call_ollama(
+            messages, timeout=60.0, model=self.fast_model, temperature=0.0, max_tokens=300,
+        )
+        data = self._parse_ai_response(response)
+        if "error" not in data:
+            self._apply_tax_rules(data, sales_tax=False)
+        return data
+
+    async def categorize_transactions_batch(self, rows: list[dict]) -> list[Dict[str, Any]]:
+        """Categorize many transactions (e.g. a bank statement) in one call.
+
+        Each row needs "description", "amount" and "vendor". Requests share the
+        pooled client and the cached system prompt and run a few at a time, as
+        many as Ollama will serve in parallel. Results come back in row order;
+        a row that fails gets an error entry instead of failing the batch.
+        """
+        semaphore = asyncio.Semaphore(CATEGORIZE_CONCURRENCY)
+
+        async def categorize(row: dict) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    return await self.categorize_transaction(
+                        row["description"], row["amount"], row["vendor"]
+                    )
+                except Exception as e:
+                    logger.error("Categorization failed for %r: %s", row.get("description"), e)
+                    return {"error": str(e), "confidence": 0.0}
+
+        return await asyncio.gather(*(categorize(row) for row in rows))
@@ -7,22 +7,33 @@ import csv
 import hashlib
 import io
 from datetime import datetime, date
-from typing import Optional
-
-
+from functools import lru_cache
+from typing import BinaryIO, NamedTuple, Optional
+
+
+# Formats common in Canadian bank CSVs, in priority order, each with a literal
+# separator the value must contain for strptime to have any chance of matching
+_DATE_FORMATS = (
+    ("%m/%d/%Y", "/"),   # MM/DD/YYYY (TD, RBC)
+    ("%Y-%m-%d", "-"),   # YYYY-MM-DD (ISO)
+    ("%d/%m/%Y", "/"),   # DD/MM/YYYY
+    ("%m-%d-%Y", "-"),   # MM-DD-YYYY
+    ("%Y/%m/%d", "/"),   # YYYY/MM/DD
+    ("%b %d, %Y", ","),  # Jan 15, 2026
+    ("%B %d, %Y", ","),  # January 15, 2026
+)
+
+
+# A statement only has a few hundred distinct dates across thousands of rows,
+# and a miss can cost several failed strptime calls, so parse each value once
+@lru_cache(maxsize=4096)
 def _parse_date(value: str) -> Optional[date]:
     """Try multiple date formats common in Canadian bank CSVs."""
-    formats = [
-        "%m/%d/%Y",   # MM/DD/YYYY (TD, RBC)
-        "%Y-%m-%d",   # YYYY-MM-DD (ISO)
-        "%d/%m/%Y",   # DD/MM/YYYY
-        "%m-%d-%Y",   # MM-DD-YYYY
-        "%Y/%m/%d",   # YYYY/MM/DD
-        "%b %d, %Y",  # Jan 15, 2026
-        "%B %d, %Y",  # January 15, 2026
-    ]
     value = value.strip()
-    for fmt in formats:
+    for fmt, separator in _DATE_FORMATS:
+        # Skip formats that can't match rather than paying for the ValueError
+        if separator not in value:
+            continue
         try:
             return datetime.strptime(value, fmt).date()
         except ValueError:
@@ -81,11 +92,17 @@ KNOWN_FORMATS = {
 }
 
 
-def _detect_format(headers: list[str]) -> Optional[dict]:
-    """Detect CSV format based on headers."""
-    lower_headers = {h.lower().strip() for h in headers}
-    for name, fmt in KNOWN_FORMATS.items():
-        if fmt["headers"].issubset(lower_headers):
+# Most specific header signature first, so a superset layout wins
+_FORMATS_BY_SPECIFICITY = tuple(
+    sorted(KNOWN_FORMATS.values(), key=lambda fmt: len(fmt["headers"]), reverse=True)
+)
+
+
+def _detect_format(headers: tuple[str, ...]) -> Optional[dict]:
+    """Detect CSV format based on (normalized) headers."""
+    header_set = frozenset(headers)
+    for fmt in _FORMATS_BY_SPECIFICITY:
+        if fmt["headers"] <= header_set:
             return fmt
     return None
 
@@ -94,9 +111,94 @@ def _normalize_header(header: str) -> str:
     return header.lower().strip()
 
 
-def parse_bank_csv(file_content: bytes, fallback_format: str = "auto") -> list[dict]:
+class _Columns(NamedTuple):
+    """Column indices for one CSV layout; None where the column is absent."""
+    date: int
+    desc: int
+    amount: Optional[int] = None
+    debit: Optional[int] = None
+    credit: Optional[int] = None
+    balance: Optional[int] = None
+    reference: Optional[int] = None
+    required: int = 0  # rows must have more cells than this index
+
+
+# Statements from the same bank repeat the same header row
+@lru_cache(maxsize=32)
+def _resolve_columns(headers: tuple[str, ...]) -> Optional[_Columns]:
+    """Map the header row to column indices, once per layout."""
+    fmt = _detect_format(headers)
+
+    if fmt and "debit_col" in fmt and "credit_col" in fmt:
+        # TD-style: separate debit/credit columns
+        cols = _Columns(
+            date=headers.index(fmt["date_col"]),
+            desc=headers.index(fmt["desc_col"]),
+            debit=headers.index(fmt["debit_col"]),
+            credit=headers.index(fmt["credit_col"]),
+            balance=headers.index("balance") if "balance" in headers else None,
+        )
+        return cols._replace(required=max(cols.date, cols.desc, cols.debit, cols.credit))
+
+    if fmt and "amount_col" in fmt:
+        # Single amount column (RBC, Scotiabank, BMO style)
+        cols = _Columns(
+            date=headers.index(fmt["date_col"]),
+            desc=headers.index(fmt["desc_col"]),
+            amount=headers.index(fmt["amount_col"]),
+            balance=headers.index("balance") if "balance" in headers else None,
+            reference=headers.index("cheque number") if "cheque number" in headers else None,
+        )
+        return cols._replace(required=max(cols.date, cols.desc, cols.amount))
+
+    # Generic fallback: try common column names
+    # Look for date, description/memo, amount/debit/credit columns
+    date_idx = None
+    desc_idx = None
+    amount_idx = None
+    debit_idx = None
+    credit_idx = None
+    balance_idx = None
+
+    for i, h in enumerate(headers):
+        if h in ("date", "transaction date", "posted date", "date posted"):
+            date_idx = i
+        elif h in ("description", "memo", "narrative", "details", "transaction details", "description 1"):
+            desc_idx = i
+        elif h in ("amount", "transaction amount", "value"):
+            amount_idx = i
+        elif h in ("debit", "withdrawal", "withdrawals"):
+            debit_idx = i
+        elif h in ("credit", "deposit", "deposits"):
+            credit_idx = i
+        elif h in ("balance", "running balance"):
+            balance_idx = i
+
+    if date_idx is None or desc_idx is None:
+        return None
+
+    # Debit/credit are only used as a pair
+    if debit_idx is None or credit_idx is None:
+        debit_idx = credit_idx = None
+
+    return _Columns(
+        date=date_idx,
+        desc=desc_idx,
+        amount=amount_idx,
+        debit=debit_idx,
+        credit=credit_idx,
+        balance=balance_idx,
+        required=max(date_idx, desc_idx),
+    )
+
+
+def parse_bank_csv(file_content: bytes | BinaryIO, fallback_format: str = "auto") -> list[dict]:
     """Parse a bank CSV file and return a list of transaction dicts.
 
+    Accepts the raw bytes or a binary file object (e.g. an upload's spooled
+    file); either way rows are decoded as they are read, without a second
+    full copy of the file as text.
+
     Returns list of:
         {
             "transaction_date": date,
@@ -107,172 +209,75 @@ def parse_bank_csv(file_content: bytes, fallback_format: str = "auto") -> list[d
             "import_hash": str,
         }
     """
-    text = file_content.decode("utf-8-sig")  # Handle BOM
-    reader = csv.reader(io.StringIO(text))
+    stream = io.BytesIO(file_content) if isinstance(file_content, bytes) else file_content
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")  # Handle BOM
+    try:
+        return _parse_rows(csv.reader(text))
+    finally:
+        text.detach()  # leave the caller's file open
+
 
+def _parse_rows(reader) -> list[dict]:
     # Read headers
     raw_headers = next(reader, None)
     if not raw_headers:
         return []
 
-    headers = [_normalize_header(h) for h in raw_headers]
-    fmt = _detect_format(headers)
-
-    transactions = []
+    cols = _resolve_columns(tuple(_normalize_header(h) for h in raw_headers))
+    if cols is None:
+        return []
 
-    if fmt and "debit_col" in fmt and "credit_col" in fmt:
-        # TD-style: separate debit/credit columns
-        date_idx = headers.index(fmt["date_col"])
-        desc_idx = headers.index(fmt["desc_col"])
-        debit_idx = headers.index(fmt["debit_col"])
-        credit_idx = headers.index(fmt["credit_col"])
-        balance_idx = headers.index("balance") if "balance" in headers else None
+    date_idx, desc_idx, amount_idx, debit_idx, credit_idx, balance_idx, ref_idx, required = cols
+    parse_date = _parse_date
+    parse_amount = _parse_amount
+    make_hash = _make_hash
 
-        for row in reader:
-            if len(row) <= max(date_idx, desc_idx, debit_idx, credit_idx):
-                continue
+    transactions = []
+    append = transactions.append
 
-            txn_date = _parse_date(row[date_idx])
-            if not txn_date:
-                continue
+    for row in reader:
+        n = len(row)
+        if n <= required:
+            continue
 
-            desc = row[desc_idx].strip()
-            if not desc:
-                continue
+        txn_date = parse_date(row[date_idx])
+        if not txn_date:
+            continue
 
-            debit = _parse_amount(row[debit_idx])
-            credit = _parse_amount(row[credit_idx])
+        desc = row[desc_idx].strip()
+        if not desc:
+            continue
 
+        amount = 0.0
+        if amount_idx is not None and amount_idx < n:
+            amount = parse_amount(row[amount_idx]) or 0.0
+        elif debit_idx is not None:
+            debit = parse_amount(row[debit_idx]) if debit_idx < n else None
+            credit = parse_amount(row[credit_idx]) if credit_idx < n else None
             # Debit = money out (negative), Credit = money in (positive)
-            amount = 0.0
             if credit and credit > 0:
                 amount = credit
             elif debit and debit > 0:
                 amount = -debit
 
-            if amount == 0.0:
-                continue
-
-            balance = None
-            if balance_idx is not None and balance_idx < len(row):
-                balance = _parse_amount(row[balance_idx])
-
-            transactions.append({
-                "transaction_date": txn_date,
-                "description": desc,
-                "amount": round(amount, 2),
-                "balance": round(balance, 2) if balance is not None else None,
-                "reference": None,
-                "import_hash": _make_hash(txn_date, desc, amount),
-            })
+        if amount == 0.0:
+            continue
 
-    elif fmt and "amount_col" in fmt:
-        # Single amount column (RBC, Scotiabank, BMO style)
-        date_idx = headers.index(fmt["date_col"])
-        desc_idx = headers.index(fmt["desc_col"])
-        amount_idx = headers.index(fmt["amount_col"])
-        balance_idx = headers.index("balance") if "balance" in headers else None
-        ref_idx = headers.index("cheque number") if "cheque number" in headers else None
-
-        for row in reader:
-            if len(row) <= max(date_idx, desc_idx, amount_idx):
-                continue
-
-            txn_date = _parse_date(row[date_idx])
-            if not txn_date:
-                continue
-
-            desc = row[desc_idx].strip()
-            if not desc:
-                continue
-
-            amount = _parse_amount(row[amount_idx])
-            if amount is None or amount == 0.0:
-                continue
-
-            balance = None
-            if balance_idx is not None and balance_idx < len(row):
-                balance = _parse_amount(row[balance_idx])
-
-            reference = None
-            if ref_idx is not None and ref_idx < len(row):
-                reference = row[ref_idx].strip() or None
-
-            transactions.append({
-                "transaction_date": txn_date,
-                "description": desc,
-                "amount": round(amount, 2),
-                "balance": round(balance, 2) if balance is not None else None,
-                "reference": reference,
-                "import_hash": _make_hash(txn_date, desc, amount),
-            })
-
-    else:
-        # Generic fallback: try common column names
-        # Look for date, description/memo, amount/debit/credit columns
-        date_idx = None
-        desc_idx = None
-        amount_idx = None
-        debit_idx = None
-        credit_idx = None
-        balance_idx = None
-
-        for i, h in enumerate(headers):
-            if h in ("date", "transaction date", "posted date", "date posted"):
-                date_idx = i
-            elif h in ("description", "memo", "narrative", "details", "transaction details", "description 1"):
-                desc_idx = i
-            elif h in ("amount", "transaction amount", "value"):
-                amount_idx = i
-            elif h in ("debit", "withdrawal", "withdrawals"):
-                debit_idx = i
-            elif h in ("credit", "deposit", "deposits"):
-                credit_idx = i
-            elif h in ("balance", "running balance"):
-                balance_idx = i
-
-        if date_idx is None or desc_idx is None:
-            return []
-
-        for row in reader:
-            if len(row) <= max(date_idx, desc_idx):
-                continue
-
-            txn_date = _parse_date(row[date_idx])
-            if not txn_date:
-                continue
-
-            desc = row[desc_idx].strip()
-            if not desc:
-                continue
-
-            amount = 0.0
-            if amount_idx is not None and amount_idx < len(row):
-                amt = _parse_amount(row[amount_idx])
-                if amt is not None:
-                    amount = amt
-            elif debit_idx is not None and credit_idx is not None:
-                debit = _parse_amount(row[debit_idx]) if debit_idx < len(row) else None
-                credit = _parse_amount(row[credit_idx]) if credit_idx < len(row) else None
-                if credit and credit > 0:
-                    amount = credit
-                elif debit and debit > 0:
-                    amount = -debit
-
-            if amount == 0.0:
-                continue
-
-            balance = None
-            if balance_idx is not None and balance_idx < len(row):
-                balance = _parse_amount(row[balance_idx])
-
-            transactions.append({
-                "transaction_date": txn_date,
-                "description": desc,
-                "amount": round(amount, 2),
-                "balance": round(balance, 2) if balance is not None else None,
-                "reference": None,
-                "import_hash": _make_hash(txn_date, desc, amount),
-            })
+        balance = None
+        if balance_idx is not None and balance_idx < n:
+            balance = parse_amount(row[balance_idx])
+
+        reference = None
+        if ref_idx is not None and ref_idx < n:
+            reference = row[ref_idx].strip() or None
+
+        append({
+            "transaction_date": txn_date,
+            "description": desc,
+            "amount": round(amount, 2),
+            "balance": round(balance, 2) if balance is not None else None,
+            "reference": reference,
+            "import_hash": make_hash(txn_date, desc, amount),
+        })
 
     return transactions
@@ -1,4 +1,5 @@
 """Default Chart of Accounts seed data for Canadian small businesses."""
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 from app.models.account import Account
 
@@ -64,26 +65,25 @@ DEFAULT_ACCOUNTS = [
 def seed_chart_of_accounts(db: Session) -> int:
     """Seed the default chart of accounts. Idempotent — skips existing accounts.
     Returns the number of accounts created."""
-    existing_codes = {a.code for a in db.query(Account.code).all()}
-    created = 0
+    existing_codes = set(db.scalars(select(Account.code)))
 
-    for code, name, acct_type, sub_type, tax_code, normal_balance in DEFAULT_ACCOUNTS:
-        if code in existing_codes:
-            continue
-        account = Account(
-            code=code,
-            name=name,
-            account_type=acct_type,
-            sub_type=sub_type,
-            tax_code=tax_code,
-            normal_balance=normal_balance,
-            is_system=True,
-            is_active=True,
-        )
-        db.add(account)
-        created += 1
+    rows = [
+        {
+            "code": code,
+            "name": name,
+            "account_type": acct_type,
+            "sub_type": sub_type,
+            "tax_code": tax_code,
+            "normal_balance": normal_balance,
+            "is_system": True,
+            "is_active": True,
+        }
+        for code, name, acct_type, sub_type, tax_code, normal_balance in DEFAULT_ACCOUNTS
+        if code not in existing_codes
+    ]
 
-    if created > 0:
+    if rows:
+        db.execute(insert(Account), rows)
         db.commit()
 
-    return created
+    return len(rows)
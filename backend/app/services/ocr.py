@@ -4,10 +4,55 @@ Uses Tesseract for local OCR processing.
 """
 import pytesseract
 from PIL import Image
+import hashlib
 import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pdf2image import convert_from_bytes
 from typing import List, Optional
 
+# Each pytesseract call runs the tesseract binary in a subprocess, so pages can
+# be recognised in parallel threads without contending for the GIL.
+_OCR_WORKERS = os.cpu_count() or 1
+_OCR_POOL = ThreadPoolExecutor(max_workers=_OCR_WORKERS, thread_name_prefix="ocr")
+
+# Long-edge size images are scaled down to before OCR
+OCR_MAX_DIMENSION = 2000
+
+# Render resolution for scanned PDFs; Tesseract is tuned for ~300 DPI text
+OCR_PDF_DPI = 300
+
+# Recognised texts kept in memory, so a reprocess or a retry after an LLM
+# failure doesn't run Tesseract on the same file again
+OCR_CACHE_SIZE = 128
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Grey level that best separates a 256-bin histogram into two classes."""
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+
+    best_threshold, best_variance = 0, 0.0
+    background, weighted_background = 0, 0
+    for i, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += i * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = i, variance
+
+    return best_threshold
+
 
 class OCRService:
     """Extract text from images and PDFs using OCR."""
@@ -17,29 +62,83 @@ class OCRService:
         # Note: Tesseract must be installed on the system
         # macOS: brew install tesseract
         # Ubuntu: apt-get install tesseract-ocr
-        pass
+        self._text_cache: OrderedDict[tuple, str] = OrderedDict()
+        self._cache_lock = threading.Lock()  # OCR runs in worker threads
+
+    def _cached_text(self, key: tuple, ocr) -> str:
+        """Return the text for key, running ocr() and remembering it on a miss."""
+        with self._cache_lock:
+            if key in self._text_cache:
+                self._text_cache.move_to_end(key)
+                return self._text_cache[key]
+
+        text = ocr()
 
-    def extract_text_from_image(self, image_bytes: bytes) -> str:
+        with self._cache_lock:
+            self._text_cache[key] = text
+            if len(self._text_cache) > OCR_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        return text
+
+    def extract_text_from_image(self, image_bytes: bytes, preprocess: bool = False) -> str:
         """
         Extract text from an image using Tesseract OCR.
 
         Args:
             image_bytes: Raw image bytes
+            preprocess: Clean up the image first (see preprocess_image),
+                without re-encoding it in between
 
         Returns:
             Extracted text
         """
+        key = ("image", hashlib.blake2b(image_bytes, digest_size=16).digest(), preprocess)
         try:
-            image = Image.open(io.BytesIO(image_bytes))
-            text = pytesseract.image_to_string(image)
-            return text.strip()
+            return self._cached_text(key, lambda: self._image_to_string(image_bytes, preprocess))
         except Exception as e:
             raise Exception(f"OCR failed: {str(e)}")
 
-    def extract_text_from_pdf(
+    def _image_to_string(self, image_bytes: bytes, preprocess: bool) -> str:
+        image = Image.open(io.BytesIO(image_bytes))
+        if preprocess:
+            try:
+                image = self._preprocess(image)
+            except Exception:
+                # If preprocessing fails, OCR the original
+                pass
+        return pytesseract.image_to_string(image).strip()
+
+    def extract_embedded_pdf_text(
         self,
         pdf_bytes: bytes,
         max_pages: int = 10
+    ) -> str:
+        """
+        Extract the text layer of a digitally generated PDF, without OCR.
+
+        Args:
+            pdf_bytes: Raw PDF bytes
+            max_pages: Maximum number of pages to read
+
+        Returns:
+            Embedded text from all pages (empty for scanned PDFs)
+        """
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(io.BytesIO(pdf_bytes))
+        text_parts = []
+        for i, page in enumerate(reader.pages[:max_pages]):
+            page_text = page.extract_text() or ""
+            if page_text.strip():
+                text_parts.append(f"--- Page {i + 1} ---\n{page_text}")
+
+        return "\n\n".join(text_parts)
+
+    def extract_text_from_pdf(
+        self,
+        pdf_bytes: bytes,
+        max_pages: int = 10,
+        dpi: int = OCR_PDF_DPI
     ) -> str:
         """
         Extract text from PDF using OCR.
@@ -48,33 +147,50 @@ class OCRService:
         Args:
             pdf_bytes: Raw PDF bytes
             max_pages: Maximum number of pages to process
+            dpi: Render resolution; OCR time grows with the square of it,
+                so large-print documents can trade accuracy for speed
 
         Returns:
             Extracted text from all pages
         """
+        key = ("pdf", hashlib.blake2b(pdf_bytes, digest_size=16).digest(), max_pages, dpi)
         try:
-            # Convert PDF to images
-            images = convert_from_bytes(pdf_bytes, dpi=300)
-
-            # Limit pages
-            images = images[:max_pages]
-
-            # Extract text from each page
-            text_parts = []
-            for i, image in enumerate(images):
-                page_text = pytesseract.image_to_string(image)
-                if page_text.strip():
-                    text_parts.append(f"--- Page {i + 1} ---\n{page_text}")
-
-            return "\n\n".join(text_parts)
-
+            return self._cached_text(key, lambda: self._pdf_to_string(pdf_bytes, max_pages, dpi))
         except Exception as e:
             raise Exception(f"PDF OCR failed: {str(e)}")
 
+    def _pdf_to_string(self, pdf_bytes: bytes, max_pages: int, dpi: int) -> str:
+        with tempfile.TemporaryDirectory(prefix="ocr-") as tmp_dir:
+            # Convert only the pages we will OCR, rendering them in
+            # parallel. Poppler writes each page straight to disk, so no
+            # page bitmaps are held in memory; Tesseract reads the files.
+            # Tesseract works on grayscale anyway, so skip the colour.
+            page_paths = convert_from_bytes(
+                pdf_bytes,
+                dpi=dpi,
+                grayscale=True,
+                last_page=max_pages,
+                thread_count=_OCR_WORKERS,
+                output_folder=tmp_dir,
+                fmt="png",
+                paths_only=True,
+            )
+
+            # Extract text from each page (in parallel, results in page order)
+            page_texts = list(_OCR_POOL.map(pytesseract.image_to_string, page_paths))
+
+        text_parts = []
+        for i, page_text in enumerate(page_texts):
+            if page_text.strip():
+                text_parts.append(f"--- Page {i + 1} ---\n{page_text}")
+
+        return "\n\n".join(text_parts)
+
     def preprocess_image(self, image_bytes: bytes) -> bytes:
         """
-        Preprocess image to improve OCR accuracy.
-        Applies grayscale conversion and contrast enhancement.
+        Preprocess image to improve OCR speed and accuracy.
+        Converts to grayscale, downscales large photos to Tesseract's
+        preferred size and binarizes with an Otsu threshold.
 
         Args:
             image_bytes: Raw image bytes
@@ -83,16 +199,7 @@ class OCRService:
             Processed image bytes
         """
         try:
-            from PIL import ImageEnhance
-
-            image = Image.open(io.BytesIO(image_bytes))
-
-            # Convert to grayscale
-            image = image.convert('L')
-
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2.0)
+            image = self._preprocess(Image.open(io.BytesIO(image_bytes)))
 
             # Save to bytes
             output = io.BytesIO()
@@ -103,6 +210,21 @@ class OCRService:
             # If preprocessing fails, return original
             return image_bytes
 
+    def _preprocess(self, image: Image.Image) -> Image.Image:
+        """Grayscale, downscale and binarize an image for OCR."""
+        # Convert to grayscale
+        image = image.convert('L')
+
+        # Phone photos are often 12MP+; Tesseract time grows with pixel
+        # count and accuracy doesn't improve past ~2000px on the long edge
+        if max(image.size) > OCR_MAX_DIMENSION:
+            image.thumbnail((OCR_MAX_DIMENSION, OCR_MAX_DIMENSION), Image.LANCZOS)
+
+        # Black text on white background, stored 1 bit per pixel: an eighth
+        # of the grayscale buffer, and a much smaller file for Tesseract
+        threshold = _otsu_threshold(image.histogram())
+        return image.point([0] * (threshold + 1) + [255] * (255 - threshold), '1')
+
     def get_confidence_score(self, image_bytes: bytes) -> float:
         """
         Get OCR confidence score for an image.
@@ -117,8 +239,10 @@ class OCRService:
             image = Image.open(io.BytesIO(image_bytes))
             data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
 
-            # Calculate average confidence
-            confidences = [int(conf) for conf in data['conf'] if conf != '-1']
+            # Calculate average confidence. Non-word boxes report -1; newer
+            # pytesseract returns numbers rather than strings, so compare
+            # numerically in a single pass
+            confidences = [conf for conf in map(float, data['conf']) if conf >= 0]
             if not confidences:
                 return 0.0
 
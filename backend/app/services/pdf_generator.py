@@ -1,14 +1,18 @@
 """PDF invoice generator using ReportLab."""
 import io
+import threading
+from collections import OrderedDict
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
 from reportlab.lib.colors import HexColor
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT, TA_RIGHT, TA_CENTER
 from reportlab.platypus import (
-    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, HRFlowable,
+    SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, HRFlowable, PageBreak,
 )
 from reportlab.lib import colors
+from reportlab.pdfbase.pdfmetrics import stringWidth
 
 
 COMPANY_NAME = "2191584 Alberta Inc."
@@ -22,12 +26,140 @@ SLATE_400 = HexColor("#94A3B8")
 SLATE_200 = HexColor("#E2E8F0")
 WHITE = colors.white
 
+# Rendered PDFs of paid invoices kept in memory. Only drafts can be edited, so
+# a paid invoice renders the same until its status, or its customer, changes
+PAID_PDF_CACHE_SIZE = 64
+_paid_pdf_cache: OrderedDict[tuple, bytes] = OrderedDict()
+_paid_pdf_lock = threading.Lock()
+
+# Text width of the item description column (3.5in less 10pt padding each side)
+_ITEM_DESCRIPTION_WIDTH = 3.5 * inch - 20
+
+# The sample stylesheet is rebuilt on every getSampleStyleSheet() call, so
+# derive the named styles from its Normal style once
+_NORMAL = getSampleStyleSheet()["Normal"]
+
+_STYLE_COMPANY = ParagraphStyle(
+    "Company", parent=_NORMAL,
+    fontSize=18, leading=22, textColor=SLATE_800, fontName="Helvetica-Bold",
+)
+_STYLE_INVOICE_TITLE = ParagraphStyle(
+    "InvoiceTitle", parent=_NORMAL,
+    fontSize=28, leading=32, textColor=INDIGO, fontName="Helvetica-Bold",
+    alignment=TA_RIGHT,
+)
+_STYLE_LABEL = ParagraphStyle(
+    "Label", parent=_NORMAL,
+    fontSize=8, leading=10, textColor=SLATE_400, fontName="Helvetica-Bold",
+    spaceAfter=2,
+)
+_STYLE_VALUE = ParagraphStyle(
+    "Value", parent=_NORMAL,
+    fontSize=10, leading=14, textColor=SLATE_800, fontName="Helvetica",
+)
+_STYLE_VALUE_BOLD = ParagraphStyle(
+    "ValueBold", parent=_NORMAL,
+    fontSize=10, leading=14, textColor=SLATE_800, fontName="Helvetica-Bold",
+)
+_STYLE_NOTES = ParagraphStyle(
+    "Notes", parent=_NORMAL,
+    fontSize=9, leading=13, textColor=SLATE_600, fontName="Helvetica",
+)
+_STYLE_FOOTER = ParagraphStyle(
+    "Footer", parent=_NORMAL,
+    fontSize=8, leading=10, textColor=SLATE_400, fontName="Helvetica",
+    alignment=TA_CENTER,
+)
+
+# Styles for the totals rows, built once rather than per invoice
+_TOTAL_LABEL = ParagraphStyle("tl", fontSize=10, textColor=SLATE_600, alignment=TA_RIGHT)
+_TOTAL_VALUE = ParagraphStyle("tv", fontSize=10, textColor=SLATE_800, alignment=TA_RIGHT, fontName="Helvetica-Bold")
+_GRAND_TOTAL_LABEL = ParagraphStyle("ttl", fontSize=12, textColor=SLATE_800, alignment=TA_RIGHT, fontName="Helvetica-Bold")
+_GRAND_TOTAL_VALUE = ParagraphStyle("ttv", fontSize=12, textColor=INDIGO, alignment=TA_RIGHT, fontName="Helvetica-Bold")
+
+
+# Table styles don't depend on the invoice, so they are shared too
+_HEADER_TABLE_STYLE = TableStyle([
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+])
+
+_DETAIL_TABLE_STYLE = TableStyle([
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("TOPPADDING", (0, 0), (-1, -1), 1),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+])
+
+_INFO_TABLE_STYLE = TableStyle([
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+])
+
+_ITEMS_TABLE_STYLE = TableStyle([
+    # Header row
+    ("BACKGROUND", (0, 0), (-1, 0), INDIGO),
+    ("TEXTCOLOR", (0, 0), (-1, 0), WHITE),
+    ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 0), (-1, 0), 9),
+    ("TOPPADDING", (0, 0), (-1, 0), 8),
+    ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
+    ("LEFTPADDING", (0, 0), (-1, -1), 10),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+    # Data rows
+    ("FONTNAME", (0, 1), (-1, -1), "Helvetica"),
+    ("FONTNAME", (-1, 1), (-1, -1), "Helvetica-Bold"),
+    ("FONTSIZE", (0, 1), (-1, -1), 10),
+    ("LEADING", (0, 1), (-1, -1), 14),
+    ("TEXTCOLOR", (0, 1), (-1, -1), SLATE_800),
+    ("TOPPADDING", (0, 1), (-1, -1), 6),
+    ("BOTTOMPADDING", (0, 1), (-1, -1), 6),
+    ("LINEBELOW", (0, 0), (-1, -1), 0.5, SLATE_200),
+    # Alignment
+    ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+    # Alternating row colors
+    ("ROWBACKGROUNDS", (0, 1), (-1, -1), [None, INDIGO_LIGHT]),
+])
+
+_TOTALS_TABLE_STYLE = TableStyle([
+    ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+    ("TOPPADDING", (0, 0), (-1, -1), 3),
+    ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
+    ("RIGHTPADDING", (0, 0), (-1, -1), 10),
+    ("LINEABOVE", (0, -1), (-1, -1), 1, SLATE_400),
+])
+
 
 def _currency(amount: float) -> str:
     """Format a number as CAD currency."""
     return f"${amount:,.2f}"
 
 
+def _city_line(customer) -> str | None:
+    """'City, Province  Postal' with whichever parts are present."""
+    line = ", ".join(part for part in (customer.city, customer.province) if part)
+    if customer.postal_code:
+        line = f"{line}  {customer.postal_code}" if line else customer.postal_code
+    return line or None
+
+
+def _render(elements: list) -> bytes:
+    """Lay out the flowables on letter pages and return the finished PDF."""
+    buf = io.BytesIO()
+    SimpleDocTemplate(
+        buf,
+        pagesize=letter,
+        leftMargin=0.75 * inch,
+        rightMargin=0.75 * inch,
+        topMargin=0.6 * inch,
+        bottomMargin=0.8 * inch,
+        # Deflate page streams whatever the global rl_config default says;
+        # text-heavy invoices shrink several times over
+        pageCompression=1,
+    ).build(elements)
+    return buf.getvalue()
+
+
 def generate_invoice_pdf(invoice) -> io.BytesIO:
     """
     Generate a professional PDF for the given invoice.
@@ -38,149 +170,140 @@ def generate_invoice_pdf(invoice) -> io.BytesIO:
     Returns:
         BytesIO buffer containing the PDF.
     """
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(
-        buf,
-        pagesize=letter,
-        leftMargin=0.75 * inch,
-        rightMargin=0.75 * inch,
-        topMargin=0.6 * inch,
-        bottomMargin=0.8 * inch,
-    )
+    return io.BytesIO(generate_invoice_pdf_bytes(invoice))
 
-    styles = getSampleStyleSheet()
 
-    # Custom styles
-    style_company = ParagraphStyle(
-        "Company", parent=styles["Normal"],
-        fontSize=18, leading=22, textColor=SLATE_800, fontName="Helvetica-Bold",
-    )
-    style_invoice_title = ParagraphStyle(
-        "InvoiceTitle", parent=styles["Normal"],
-        fontSize=28, leading=32, textColor=INDIGO, fontName="Helvetica-Bold",
-        alignment=TA_RIGHT,
-    )
-    style_label = ParagraphStyle(
-        "Label", parent=styles["Normal"],
-        fontSize=8, leading=10, textColor=SLATE_400, fontName="Helvetica-Bold",
-        spaceAfter=2,
-    )
-    style_value = ParagraphStyle(
-        "Value", parent=styles["Normal"],
-        fontSize=10, leading=14, textColor=SLATE_800, fontName="Helvetica",
-    )
-    style_value_bold = ParagraphStyle(
-        "ValueBold", parent=styles["Normal"],
-        fontSize=10, leading=14, textColor=SLATE_800, fontName="Helvetica-Bold",
-    )
-    style_notes = ParagraphStyle(
-        "Notes", parent=styles["Normal"],
-        fontSize=9, leading=13, textColor=SLATE_600, fontName="Helvetica",
-    )
-    style_footer = ParagraphStyle(
-        "Footer", parent=styles["Normal"],
-        fontSize=8, leading=10, textColor=SLATE_400, fontName="Helvetica",
-        alignment=TA_CENTER,
+def generate_invoice_pdf_bytes(invoice) -> bytes:
+    """Same as generate_invoice_pdf, as bytes ready to send in a response."""
+    key = _paid_pdf_key(invoice)
+    if key is None:
+        return _render(_build_invoice_elements(invoice))
+
+    with _paid_pdf_lock:
+        if key in _paid_pdf_cache:
+            _paid_pdf_cache.move_to_end(key)
+            return _paid_pdf_cache[key]
+
+    pdf_bytes = _render(_build_invoice_elements(invoice))
+
+    with _paid_pdf_lock:
+        _paid_pdf_cache[key] = pdf_bytes
+        if len(_paid_pdf_cache) > PAID_PDF_CACHE_SIZE:
+            _paid_pdf_cache.popitem(last=False)
+    return pdf_bytes
+
+
+def _paid_pdf_key(invoice) -> tuple | None:
+    """Cache key for a paid invoice's PDF, or None if it may still change."""
+    if invoice.status != "paid" or not invoice.paid_date or invoice.updated_at is None:
+        return None
+    customer = invoice.customer
+    return (
+        invoice.id,
+        invoice.updated_at,
+        invoice.paid_date,
+        customer.id if customer else None,
+        customer.updated_at if customer else None,
     )
 
+
+def generate_invoices_pdf(invoices) -> bytes:
+    """
+    Generate one PDF containing several invoices, each starting on a new page.
+
+    The document, canvas and fonts are set up once for the whole batch
+    instead of once per invoice.
+
+    Args:
+        invoices: Invoice objects with .customer and .items loaded.
+
+    Returns:
+        The PDF as bytes.
+    """
+    elements = []
+    for i, invoice in enumerate(invoices):
+        if i:
+            elements.append(PageBreak())
+        elements.extend(_build_invoice_elements(invoice))
+    return _render(elements)
+
+
+def _build_invoice_elements(invoice) -> list:
+    """Flowables for one invoice, from the header down to the footer."""
     elements = []
     customer = invoice.customer
 
     # ── Header: Company name + INVOICE title ──
     header_data = [
         [
-            Paragraph(COMPANY_NAME, style_company),
-            Paragraph("INVOICE", style_invoice_title),
+            Paragraph(COMPANY_NAME, _STYLE_COMPANY),
+            Paragraph("INVOICE", _STYLE_INVOICE_TITLE),
         ]
     ]
     header_table = Table(header_data, colWidths=[3.5 * inch, 3.5 * inch])
-    header_table.setStyle(TableStyle([
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("ALIGN", (1, 0), (1, 0), "RIGHT"),
-    ]))
+    header_table.setStyle(_HEADER_TABLE_STYLE)
     elements.append(header_table)
     elements.append(Spacer(1, 0.3 * inch))
 
     # ── Invoice details + Bill To ──
-    # Left side: Bill To
-    bill_to_parts = [
-        Paragraph("BILL TO", style_label),
-        Paragraph(customer.name, style_value_bold),
+    # Left side: Bill To, as one Paragraph with a line per field. Values are
+    # escaped since Paragraph text is markup.
+    optional_lines = (
+        customer.address_line1,
+        customer.address_line2,
+        _city_line(customer),
+        customer.email,
+        customer.phone,
+    )
+    bill_to_lines = [f"<b>{escape(customer.name)}</b>"]
+    bill_to_lines += [escape(line) for line in optional_lines if line]
+
+    bill_to_cell = [
+        Paragraph("BILL TO", _STYLE_LABEL),
+        Paragraph("<br/>".join(bill_to_lines), _STYLE_VALUE),
     ]
-    if customer.address_line1:
-        bill_to_parts.append(Paragraph(customer.address_line1, style_value))
-    if customer.address_line2:
-        bill_to_parts.append(Paragraph(customer.address_line2, style_value))
-
-    city_parts = []
-    if customer.city:
-        city_parts.append(customer.city)
-    if customer.province:
-        city_parts.append(customer.province)
-    if city_parts:
-        line = ", ".join(city_parts)
-        if customer.postal_code:
-            line += f"  {customer.postal_code}"
-        bill_to_parts.append(Paragraph(line, style_value))
-    elif customer.postal_code:
-        bill_to_parts.append(Paragraph(customer.postal_code, style_value))
-
-    if customer.email:
-        bill_to_parts.append(Paragraph(customer.email, style_value))
-    if customer.phone:
-        bill_to_parts.append(Paragraph(customer.phone, style_value))
 
     # Right side: Invoice details
     status_display = invoice.status.upper()
     detail_rows = [
-        [Paragraph("INVOICE #", style_label), Paragraph(invoice.invoice_number, style_value_bold)],
-        [Paragraph("DATE", style_label), Paragraph(str(invoice.invoice_date), style_value)],
-        [Paragraph("DUE DATE", style_label), Paragraph(str(invoice.due_date), style_value)],
-        [Paragraph("STATUS", style_label), Paragraph(status_display, style_value_bold)],
+        [Paragraph("INVOICE #", _STYLE_LABEL), Paragraph(invoice.invoice_number, _STYLE_VALUE_BOLD)],
+        [Paragraph("DATE", _STYLE_LABEL), Paragraph(str(invoice.invoice_date), _STYLE_VALUE)],
+        [Paragraph("DUE DATE", _STYLE_LABEL), Paragraph(str(invoice.due_date), _STYLE_VALUE)],
+        [Paragraph("STATUS", _STYLE_LABEL), Paragraph(status_display, _STYLE_VALUE_BOLD)],
     ]
     if invoice.paid_date:
         detail_rows.append(
-            [Paragraph("PAID DATE", style_label), Paragraph(str(invoice.paid_date), style_value)]
+            [Paragraph("PAID DATE", _STYLE_LABEL), Paragraph(str(invoice.paid_date), _STYLE_VALUE)]
         )
 
     detail_table = Table(detail_rows, colWidths=[0.9 * inch, 1.8 * inch])
-    detail_table.setStyle(TableStyle([
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("TOPPADDING", (0, 0), (-1, -1), 1),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-    ]))
+    detail_table.setStyle(_DETAIL_TABLE_STYLE)
 
     # Combine left (bill to) and right (details) in a 2-column layout
-    # Stack bill_to_parts into a single cell
-    bill_to_cell = []
-    for p in bill_to_parts:
-        bill_to_cell.append(p)
-
     info_data = [[bill_to_cell, detail_table]]
     info_table = Table(info_data, colWidths=[3.5 * inch, 3.5 * inch])
-    info_table.setStyle(TableStyle([
-        ("VALIGN", (0, 0), (-1, -1), "TOP"),
-        ("ALIGN", (1, 0), (1, 0), "RIGHT"),
-    ]))
+    info_table.setStyle(_INFO_TABLE_STYLE)
     elements.append(info_table)
     elements.append(Spacer(1, 0.4 * inch))
 
     # ── Line Items Table ──
-    items_header = [
-        Paragraph("<b>Description</b>", ParagraphStyle("th", fontSize=9, textColor=WHITE, fontName="Helvetica-Bold")),
-        Paragraph("<b>Qty</b>", ParagraphStyle("th", fontSize=9, textColor=WHITE, fontName="Helvetica-Bold", alignment=TA_RIGHT)),
-        Paragraph("<b>Unit Price</b>", ParagraphStyle("th", fontSize=9, textColor=WHITE, fontName="Helvetica-Bold", alignment=TA_RIGHT)),
-        Paragraph("<b>Amount</b>", ParagraphStyle("th", fontSize=9, textColor=WHITE, fontName="Helvetica-Bold", alignment=TA_RIGHT)),
-    ]
+    # Font, colour and alignment come from the header row's TableStyle
+    items_header = ["Description", "Qty", "Unit Price", "Amount"]
 
     items_data = [items_header]
     for item in invoice.items:
         qty_str = f"{item.quantity:g}"  # remove trailing .0
+        # Plain strings are drawn directly, styled by the table below; only a
+        # description too wide for its column needs a Paragraph to wrap it,
+        # escaped so it shows the same text as a short one
+        description = item.description
+        if stringWidth(description, "Helvetica", 10) > _ITEM_DESCRIPTION_WIDTH:
+            description = Paragraph(escape(description), _STYLE_VALUE)
         items_data.append([
-            Paragraph(item.description, style_value),
-            Paragraph(qty_str, ParagraphStyle("r", fontSize=10, alignment=TA_RIGHT, textColor=SLATE_800)),
-            Paragraph(_currency(item.unit_price), ParagraphStyle("r", fontSize=10, alignment=TA_RIGHT, textColor=SLATE_800)),
-            Paragraph(_currency(item.amount), ParagraphStyle("r", fontSize=10, alignment=TA_RIGHT, textColor=SLATE_800, fontName="Helvetica-Bold")),
+            description,
+            qty_str,
+            _currency(item.unit_price),
+            _currency(item.amount),
         ])
 
     items_table = Table(
@@ -189,31 +312,7 @@ def generate_invoice_pdf(invoice) -> io.BytesIO:
         repeatRows=1,
     )
 
-    # Table styling
-    table_style = [
-        # Header row
-        ("BACKGROUND", (0, 0), (-1, 0), INDIGO),
-        ("TEXTCOLOR", (0, 0), (-1, 0), WHITE),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, 0), 9),
-        ("TOPPADDING", (0, 0), (-1, 0), 8),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 8),
-        ("LEFTPADDING", (0, 0), (-1, -1), 10),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-        # Data rows
-        ("TOPPADDING", (0, 1), (-1, -1), 6),
-        ("BOTTOMPADDING", (0, 1), (-1, -1), 6),
-        ("LINEBELOW", (0, 0), (-1, -1), 0.5, SLATE_200),
-        # Alignment
-        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-    ]
-    # Alternating row colors
-    for i in range(1, len(items_data)):
-        if i % 2 == 0:
-            table_style.append(("BACKGROUND", (0, i), (-1, i), INDIGO_LIGHT))
-
-    items_table.setStyle(TableStyle(table_style))
+    items_table.setStyle(_ITEMS_TABLE_STYLE)
     elements.append(items_table)
     elements.append(Spacer(1, 0.25 * inch))
 
@@ -226,50 +325,39 @@ def generate_invoice_pdf(invoice) -> io.BytesIO:
 
     totals_data.append(["TOTAL", _currency(invoice.total)])
 
-    totals_style_label = ParagraphStyle("tl", fontSize=10, textColor=SLATE_600, alignment=TA_RIGHT)
-    totals_style_value = ParagraphStyle("tv", fontSize=10, textColor=SLATE_800, alignment=TA_RIGHT, fontName="Helvetica-Bold")
-    totals_style_total_label = ParagraphStyle("ttl", fontSize=12, textColor=SLATE_800, alignment=TA_RIGHT, fontName="Helvetica-Bold")
-    totals_style_total_value = ParagraphStyle("ttv", fontSize=12, textColor=INDIGO, alignment=TA_RIGHT, fontName="Helvetica-Bold")
-
     formatted_totals = []
     for i, (label, value) in enumerate(totals_data):
         if i == len(totals_data) - 1:  # TOTAL row
             formatted_totals.append([
-                Paragraph(label, totals_style_total_label),
-                Paragraph(value, totals_style_total_value),
+                Paragraph(label, _GRAND_TOTAL_LABEL),
+                Paragraph(value, _GRAND_TOTAL_VALUE),
             ])
         else:
             formatted_totals.append([
-                Paragraph(label, totals_style_label),
-                Paragraph(value, totals_style_value),
+                Paragraph(label, _TOTAL_LABEL),
+                Paragraph(value, _TOTAL_VALUE),
             ])
 
+    # Lined up under the last two item columns by right-aligning the table
     totals_table = Table(
-        [["", "", lbl, val] for lbl, val in formatted_totals],
-        colWidths=[3.5 * inch, 0.8 * inch, 1.35 * inch, 1.35 * inch],
+        formatted_totals,
+        colWidths=[1.35 * inch, 1.35 * inch],
+        hAlign="RIGHT",
     )
-    totals_table.setStyle(TableStyle([
-        ("ALIGN", (2, 0), (-1, -1), "RIGHT"),
-        ("TOPPADDING", (0, 0), (-1, -1), 3),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 3),
-        ("RIGHTPADDING", (0, 0), (-1, -1), 10),
-        ("LINEABOVE", (2, len(formatted_totals) - 1), (-1, len(formatted_totals) - 1), 1, SLATE_400),
-    ]))
+    totals_table.setStyle(_TOTALS_TABLE_STYLE)
     elements.append(totals_table)
 
     # ── Notes ──
     if invoice.notes:
         elements.append(Spacer(1, 0.4 * inch))
-        elements.append(Paragraph("NOTES", style_label))
+        elements.append(Paragraph("NOTES", _STYLE_LABEL))
         elements.append(Spacer(1, 4))
-        elements.append(Paragraph(invoice.notes, style_notes))
+        elements.append(Paragraph(invoice.notes, _STYLE_NOTES))
 
     # ── Footer ──
     elements.append(Spacer(1, 0.6 * inch))
     elements.append(HRFlowable(width="100%", thickness=0.5, color=SLATE_200))
     elements.append(Spacer(1, 8))
-    elements.append(Paragraph(f"GST# {GST_NUMBER}", style_footer))
+    elements.append(Paragraph(f"GST# {GST_NUMBER}", _STYLE_FOOTER))
 
-    doc.build(elements)
-    buf.seek(0)
-    return buf
+    return elements
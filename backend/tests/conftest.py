@@ -0,0 +1,40 @@
+"""Shared fixtures: an in-memory SQLite database with the default chart of accounts."""
+import os
+
+# Settings are read at import time, so point them at a throwaway database
+# before anything from app is imported
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("AUTH_PASSWORD_HASH", "test")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.deps import get_current_user
+from app.db import Base, SessionLocal, engine, init_db
+from app.main import app
+from app.services.coa_seed import seed_chart_of_accounts
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    seed_chart_of_accounts(session)
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(db):
+    """API client, signed in, sharing the db fixture's database.
+
+    Not used as a context manager, so the startup hooks don't run again."""
+    app.dependency_overrides[get_current_user] = lambda: {"sub": "test"}
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.pop(get_current_user, None)
@@ -0,0 +1,83 @@
+"""Bank statement CSV imports and the import hash dedup."""
+from datetime import date
+
+from sqlalchemy import event, inspect, text
+
+from app.db import engine, init_db
+from app.models import BankAccount, BankTransaction
+from app.services.bank_import import parse_bank_csv
+
+STATEMENT = (
+    b"Date,Description,Amount\n"
+    b"01/02/2026,Coffee,-4.50\n"
+    b"01/03/2026,Deposit,100.00\n"
+)
+
+
+def _bank_account(db) -> int:
+    account = BankAccount(name="Chequing")
+    db.add(account)
+    db.commit()
+    return account.id
+
+
+def _import(client, bank_account_id: int):
+    return client.post(
+        f"/api/bank-accounts/{bank_account_id}/import",
+        files={"file": ("statement.csv", STATEMENT, "text/csv")},
+    )
+
+
+def test_reimport_skips_duplicates(client, db):
+    bank_account_id = _bank_account(db)
+
+    assert _import(client, bank_account_id).json()["imported"] == 2
+    body = _import(client, bank_account_id).json()
+
+    assert (body["imported"], body["skipped"]) == (0, 2)
+    assert body["new_balance"] == 95.5
+
+
+def test_rows_imported_concurrently_are_skipped(client, db):
+    bank_account_id = _bank_account(db)
+    deposit = parse_bank_csv(STATEMENT)[1]
+
+    # Another import commits the deposit between the dedup lookup and the insert
+    def insert_after_lookup(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("SELECT bank_transactions.import_hash"):
+            cursor.connection.execute(
+                "INSERT INTO bank_transactions "
+                "(bank_account_id, transaction_date, description, amount, import_hash) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (bank_account_id, deposit["transaction_date"].isoformat(),
+                 deposit["description"], deposit["amount"], deposit["import_hash"]),
+            )
+
+    event.listen(engine, "after_cursor_execute", insert_after_lookup)
+    try:
+        response = _import(client, bank_account_id)
+    finally:
+        event.remove(engine, "after_cursor_execute", insert_after_lookup)
+
+    assert response.status_code == 200
+    assert (response.json()["imported"], response.json()["skipped"]) == (1, 1)
+    assert db.query(BankTransaction).count() == 2
+
+
+def test_existing_duplicates_dont_block_startup(db):
+    bank_account_id = _bank_account(db)
+    db.execute(text("DROP INDEX ix_bt_account_import_hash"))
+    db.add_all(
+        BankTransaction(
+            bank_account_id=bank_account_id, transaction_date=date(2026, 1, 2),
+            description="Coffee", amount=-4.5, import_hash="same",
+        )
+        for _ in range(2)
+    )
+    db.commit()
+
+    init_db()
+
+    index_names = {ix["name"] for ix in inspect(engine).get_indexes("bank_transactions")}
+    assert "ix_bt_account_import_hash" not in index_names
+    assert "ix_bt_account_date" in index_names
@@ -0,0 +1,35 @@
+"""Invoice PDF rendering."""
+import io
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+from PyPDF2 import PdfReader
+
+from app.services.pdf_generator import generate_invoice_pdf_bytes
+
+
+def _invoice(description: str):
+    customer = SimpleNamespace(
+        id=1, name="Acme & Co", email=None, phone=None, address_line1=None, address_line2=None,
+        city=None, province=None, postal_code=None, updated_at=None,
+    )
+    item = SimpleNamespace(description=description, quantity=1, unit_price=10.0, amount=10.0)
+    return SimpleNamespace(
+        id=1, invoice_number="INV-1001", customer=customer, items=[item],
+        invoice_date=date(2024, 1, 1), due_date=date(2024, 1, 31), status="sent", paid_date=None,
+        subtotal=10.0, gst_rate=0.0, gst_amount=0.0, total=10.0, notes=None, updated_at=None,
+    )
+
+
+def _text(pdf: bytes) -> str:
+    return " ".join(page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages)
+
+
+@pytest.mark.parametrize("description", [
+    "a<b>c R&amp;D",
+    "a<b>c R&amp;D " + "long enough to wrap onto a second line " * 3,
+])
+def test_item_description_printed_as_given(description):
+    pdf = generate_invoice_pdf_bytes(_invoice(description))
+    assert "a<b>c R&amp;D" in _text(pdf)
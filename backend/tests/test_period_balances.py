@@ -0,0 +1,170 @@
+"""The monthly balance rollup must agree with a direct sum of journal lines."""
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import func
+
+from app.models import Account, AccountPeriodBalance, JournalEntry, JournalEntryLine, Transaction
+from app.services.journal_service import (
+    account_activity,
+    create_je_for_transaction,
+    create_manual_journal_entry,
+    delete_je_for_transaction,
+    refresh_period_balances,
+)
+
+# Ranges that start and end on, just before and just after month boundaries,
+# including a leap day and a year end
+RANGES = [
+    (None, date(2024, 12, 31)),
+    (None, date(2025, 3, 15)),
+    (date(2024, 1, 1), date(2024, 1, 31)),
+    (date(2024, 1, 31), date(2024, 2, 1)),
+    (date(2024, 1, 15), date(2024, 3, 14)),
+    (date(2024, 2, 1), date(2024, 2, 29)),
+    (date(2024, 2, 29), date(2024, 3, 1)),
+    (date(2024, 2, 2), date(2024, 2, 28)),
+    (date(2024, 3, 1), date(2025, 2, 28)),
+    (date(2024, 12, 31), date(2025, 1, 1)),
+    (date(2024, 6, 10), date(2024, 6, 10)),
+]
+
+ENTRY_DATES = [
+    date(2024, 1, 1), date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 29),
+    date(2024, 3, 1), date(2024, 6, 10), date(2024, 12, 31), date(2025, 1, 1),
+]
+
+
+def _account_id(db, code: str) -> int:
+    return db.query(Account.id).filter(Account.code == code).scalar()
+
+
+def _post(db, entry_date: date, amount: float, debit: str = "5250", credit: str = "1050") -> JournalEntry:
+    return create_manual_journal_entry(db, entry_date, "test", [
+        {"account_id": _account_id(db, debit), "debit": amount, "credit": 0},
+        {"account_id": _account_id(db, credit), "debit": 0, "credit": amount},
+    ])
+
+
+def _line_sum(db, account_id: int, start: date | None, end: date) -> tuple[float, float]:
+    query = db.query(
+        func.coalesce(func.sum(JournalEntryLine.debit), 0),
+        func.coalesce(func.sum(JournalEntryLine.credit), 0),
+    ).join(JournalEntry).filter(
+        JournalEntryLine.account_id == account_id,
+        JournalEntry.is_posted == True,
+        JournalEntry.entry_date <= end,
+    )
+    if start is not None:
+        query = query.filter(JournalEntry.entry_date >= start)
+    return query.one()
+
+
+def _assert_rollup_matches(db, codes=("5250", "1050")):
+    for code in codes:
+        account_id = _account_id(db, code)
+        for start, end in RANGES:
+            assert account_activity(db, account_id, start, end) == pytest.approx(
+                _line_sum(db, account_id, start, end), abs=0.001
+            ), (code, start, end)
+
+
+def _bucket(db, code: str, year: int, month: int) -> AccountPeriodBalance | None:
+    db.expire_all()
+    return db.get(AccountPeriodBalance, (_account_id(db, code), year, month))
+
+
+def test_activity_matches_lines_across_month_edges(db):
+    for i, entry_date in enumerate(ENTRY_DATES):
+        _post(db, entry_date, 10.01 * (i + 1))
+    db.commit()
+
+    _assert_rollup_matches(db)
+    assert _bucket(db, "5250", 2024, 2).debit_cents == 3003 + 4004
+
+
+def test_edit_amount(db):
+    je = _post(db, date(2024, 2, 29), 100.0)
+    db.commit()
+
+    je.lines[0].debit = je.lines[1].credit = 42.5
+    db.commit()
+
+    _assert_rollup_matches(db)
+    assert _bucket(db, "1050", 2024, 2).credit_cents == 4250
+
+
+def test_move_date_across_months(db):
+    je = _post(db, date(2024, 1, 31), 100.0)
+    _post(db, date(2024, 3, 1), 5.0)
+    db.commit()
+
+    je.entry_date = date(2024, 2, 1)
+    db.commit()
+
+    _assert_rollup_matches(db)
+    assert _bucket(db, "5250", 2024, 1) is None
+    assert _bucket(db, "5250", 2024, 2).debit_cents == 10000
+
+
+def test_unpost_and_repost(db):
+    je = _post(db, date(2024, 6, 10), 100.0)
+    _post(db, date(2024, 6, 11), 1.0)
+    db.commit()
+
+    je.is_posted = False
+    db.commit()
+    _assert_rollup_matches(db)
+    assert _bucket(db, "5250", 2024, 6).debit_cents == 100
+
+    je.is_posted = True
+    db.commit()
+    _assert_rollup_matches(db)
+    assert _bucket(db, "5250", 2024, 6).debit_cents == 10100
+
+
+def test_delete_entry(db):
+    je = _post(db, date(2024, 12, 31), 100.0)
+    _post(db, date(2025, 1, 1), 3.0)
+    db.commit()
+
+    db.delete(je)
+    db.commit()
+
+    _assert_rollup_matches(db)
+    assert _bucket(db, "5250", 2024, 12) is None
+    assert _bucket(db, "5250", 2025, 1).debit_cents == 300
+
+
+def test_delete_je_for_transaction(db):
+    txn = Transaction(
+        transaction_date=datetime(2024, 2, 29), description="Paper", amount=50.0,
+        tax_amount=2.5, category="expense", subcategory="office_supplies", payment_method="debit",
+    )
+    db.add(txn)
+    db.flush()
+    create_je_for_transaction(db, txn)
+    _post(db, date(2024, 2, 1), 7.0)
+    db.commit()
+    assert _bucket(db, "1300", 2024, 2).debit_cents == 250
+
+    assert delete_je_for_transaction(db, txn.id) == 1
+    db.commit()
+
+    _assert_rollup_matches(db, codes=("5250", "1050", "1300"))
+    assert _bucket(db, "1300", 2024, 2) is None
+    assert _bucket(db, "1050", 2024, 2).credit_cents == 700
+
+
+def test_refresh_existing_bucket(db):
+    _post(db, date(2024, 6, 10), 100.0)
+    db.commit()
+    period = (_account_id(db, "5250"), 2024, 6)
+
+    # The row already exists: the refresh updates it in place
+    refresh_period_balances(db, {period})
+    refresh_period_balances(db, {period})
+    db.commit()
+
+    assert _bucket(db, "5250", 2024, 6).debit_cents == 10000
+    assert db.query(AccountPeriodBalance).count() == 2
@@ -0,0 +1,33 @@
+"""Tax treatment filled in from the extracted vendor province and tax amount."""
+import pytest
+
+from app.services.ai_processor import AIDocumentProcessor
+
+
+@pytest.fixture
+def processor():
+    return AIDocumentProcessor()
+
+
+@pytest.mark.parametrize("data, expected", [
+    ({"tax_amount": 13.0, "vendor_province": "ON"}, ("HST", 0.13)),
+    ({"tax_amount": 13.0, "vendor_province": "Ontario"}, ("HST", 0.13)),
+    ({"tax_amount": 15.0, "vendor_province": "P.E.I."}, ("HST", 0.15)),
+    ({"tax_amount": 5.0, "vendor_province": "british columbia"}, ("GST", 0.05)),
+    ({"tax_amount": 0.0, "vendor_province": "ON"}, ("none", 0.0)),
+    # No tax shown, or not a Canadian vendor: left unknown
+    ({"vendor_province": "ON"}, (None, None)),
+    ({"tax_amount": None, "vendor_province": "ON"}, (None, None)),
+    ({"tax_amount": "5.00", "vendor_province": "ON"}, (None, None)),
+    ({"tax_amount": 5.0, "vendor_province": "WA"}, (None, None)),
+    ({"tax_amount": 5.0, "vendor_province": "Texas"}, (None, None)),
+])
+def test_sales_tax(processor, data, expected):
+    processor._apply_tax_rules(data)
+    assert (data["tax_type"], data["tax_rate"]) == expected
+
+
+def test_meals_half_deductible(processor):
+    data = {"category": "meals_and_entertainment"}
+    processor._apply_tax_rules(data, sales_tax=False)
+    assert data == {"category": "meals_and_entertainment", "deduction_percentage": 50, "tax_deductible": True}
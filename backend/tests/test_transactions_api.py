@@ -0,0 +1,25 @@
+"""Transaction endpoints."""
+from app.models import JournalEntry, Transaction
+
+
+def test_bulk_create_returns_ids_in_item_order(client, db):
+    items = [
+        {
+            "transaction_date": f"2024-03-{day:02d}",
+            "description": f"Item {i}",
+            "amount": 10.0 + i,
+            "category": "expense",
+            "subcategory": "office_supplies",
+        }
+        # Dates out of order, so the rows don't sort the same way by chance
+        for i, day in enumerate([17, 3, 28, 9, 1, 22, 14])
+    ]
+
+    response = client.post("/api/transactions/bulk", json={"items": items})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["created"] == len(items)
+    descriptions = dict(db.query(Transaction.id, Transaction.description))
+    assert [descriptions[i] for i in body["ids"]] == [item["description"] for item in items]
+    assert db.query(JournalEntry).count() == len(items)